@@ -1,7 +1,19 @@
 from django.contrib import admin
+from django.db import models
 
-from .models import Category, Location, Post
+from .models import Category, Comment, Location, Post
+from .uploads import ProcessedImageField
 
 admin.site.register(Category)
 admin.site.register(Location)
-admin.site.register(Post)
+
+
+@admin.register(Post)
+class PostAdmin(admin.ModelAdmin):
+    # Картинки из админки проходят ту же обработку, что и с сайта.
+    formfield_overrides = {
+        models.ImageField: {'form_class': ProcessedImageField},
+    }
+
+
+admin.site.register(Comment)
@@ -0,0 +1,59 @@
+"""Сборка мусора в хранилище картинок публикаций.
+
+Файлы картинок адресуются содержимым и разделяются между постами,
+поэтому удаляются не вместе с постом, а отдельным проходом: файл,
+на который не ссылается ни один пост, удаляется, если он не менялся
+дольше периода ожидания. Период нужен, чтобы не удалить файл, который
+только что загрузили, а пост с ним ещё не сохранили.
+"""
+import os
+import time
+
+from django.db.models import Count
+
+from blog.models import Post
+from blog.renditions import rendition_names
+
+SWEPT_DIRECTORIES = ('post_images', 'renditions')
+
+
+def reference_counts():
+    """{имя файла: число постов, которые на него ссылаются}."""
+    return dict(
+        Post.objects.exclude(image='')
+        .order_by()
+        .values('image')
+        .annotate(references=Count('pk'))
+        .values_list('image', 'references')
+    )
+
+
+def _stored_files(storage):
+    root = storage.path('')
+    for directory in SWEPT_DIRECTORIES:
+        for dirpath, _, filenames in os.walk(storage.path(directory)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, root).replace(os.sep, '/'), path
+
+
+def sweep_unreferenced(grace_seconds, dry_run=False):
+    """Удаляет файлы без ссылок старше `grace_seconds`.
+
+    Копии (renditions) живут, пока жив их оригинал. Возвращает список
+    удалённых (или подлежащих удалению при `dry_run`) имён.
+    """
+    storage = Post._meta.get_field('image').storage
+    alive = set()
+    for name in reference_counts():
+        alive.add(name)
+        alive.update(rendition_names(name))
+    deadline = time.time() - grace_seconds
+    removed = []
+    for name, path in _stored_files(storage):
+        if name in alive or os.path.getmtime(path) > deadline:
+            continue
+        if not dry_run:
+            storage.delete(name)
+        removed.append(name)
+    return removed
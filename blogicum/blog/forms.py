@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserChangeForm
 
 from .models import Comment, Post, User
+from .uploads import ProcessedImageField
 
 
 class CustomUserChangeForm(UserChangeForm):
@@ -16,6 +17,7 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         exclude = ('author',)
+        field_classes = {'image': ProcessedImageField}
         widgets = {
             'pub_date': forms.DateInput(attrs={'type': 'datetime-local'})
         }
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from core.cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = 'Заново формирует анонсы публикаций пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько публикаций обновлять в одной транзакции.',
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        last_pk = 0
+        updated = 0
+        while True:
+            posts = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'text', 'excerpt')[:chunk_size]
+            )
+            if not posts:
+                break
+            changed = []
+            for post in posts:
+                excerpt = Post.make_excerpt(post.text)
+                if post.excerpt != excerpt:
+                    post.excerpt = excerpt
+                    changed.append(post)
+            if changed:
+                with transaction.atomic():
+                    Post.objects.bulk_update(changed, ['excerpt'])
+                updated += len(changed)
+                # bulk_update не отправляет сигналы, поэтому закэшированные
+                # карточки и страницы сбрасываются здесь.
+                invalidate_tags(
+                    'post-list', *(f'post:{post.pk}' for post in changed))
+            last_pk = posts[-1].pk
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено анонсов: {updated}')
+        )
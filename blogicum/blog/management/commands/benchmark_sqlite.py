@@ -0,0 +1,150 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_sqlite_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT,'
+    ' text TEXT, pub_date REAL)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER,'
+    ' text TEXT, created_at REAL)',
+    'CREATE INDEX comment_post ON comment (post_id, created_at)',
+)
+FEED_QUERY = (
+    'SELECT id, title, pub_date FROM post'
+    ' ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?'
+)
+DETAIL_QUERIES = (
+    'SELECT title, text FROM post WHERE id = ?',
+    'SELECT text FROM comment WHERE post_id = ? ORDER BY created_at LIMIT 20',
+)
+INSERT_COMMENT = (
+    'INSERT INTO comment (post_id, text, created_at) VALUES (?, ?, ?)')
+
+
+class Worker(threading.Thread):
+    """Поток, выполняющий «запросы» до истечения времени.
+
+    Без постоянных соединений каждый запрос открывает своё соединение,
+    как Django при CONN_MAX_AGE = 0.
+    """
+
+    def __init__(self, path, pragmas, persistent, write, posts, deadline):
+        super().__init__()
+        self.path = path
+        self.pragmas = pragmas
+        self.persistent = persistent
+        self.write = write
+        self.posts = posts
+        self.deadline = deadline
+        self.done = 0
+        self.errors = 0
+
+    def connect(self):
+        # Модуль sqlite3 по умолчанию ждёт блокировку 5 с, и базовый
+        # профиль перестал бы быть «голым»: ожидание берётся только из
+        # busy_timeout профиля, причём сразу — уже переключение в WAL
+        # может столкнуться с другим потоком.
+        timeout = self.pragmas.get('busy_timeout', 0) / 1000
+        connection = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None)
+        apply_sqlite_pragmas(connection.cursor(), self.pragmas)
+        return connection
+
+    def request(self, connection):
+        post_id = random.randint(1, self.posts)
+        if self.write:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                INSERT_COMMENT, (post_id, 'Комментарий', time.time()))
+            connection.execute('COMMIT')
+            return
+        connection.execute(
+            FEED_QUERY, (random.randrange(0, self.posts, 10),)).fetchall()
+        for query in DETAIL_QUERIES:
+            connection.execute(query, (post_id,)).fetchall()
+
+    def run(self):
+        connection = self.connect() if self.persistent else None
+        while time.monotonic() < self.deadline:
+            current = connection or self.connect()
+            try:
+                self.request(current)
+                self.done += 1
+            except sqlite3.OperationalError:
+                self.errors += 1
+                if current.in_transaction:
+                    current.execute('ROLLBACK')
+            finally:
+                if connection is None:
+                    current.close()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite с настройками по '
+            'умолчанию и с профилем SQLITE_PRAGMAS на временной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5,
+                            help='Длительность каждого прогона, с.')
+        parser.add_argument('--posts', type=int, default=10_000,
+                            help='Сколько постов создать во временной базе.')
+
+    def prepare(self, path, posts):
+        connection = sqlite3.connect(path)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.executemany(
+            'INSERT INTO post (title, text, pub_date) VALUES (?, ?, ?)',
+            (
+                (f'Пост {i}', 'Текст поста. ' * 50, now - i)
+                for i in range(posts)
+            ),
+        )
+        connection.commit()
+        connection.close()
+
+    def run_profile(self, path, pragmas, persistent, options):
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            Worker(path, pragmas, persistent, write, options['posts'],
+                   deadline)
+            for write in (
+                [False] * options['readers'] + [True] * options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for write, label in ((False, 'чтение'), (True, 'запись')):
+            done = sum(w.done for w in workers if w.write == write)
+            errors = sum(w.errors for w in workers if w.write == write)
+            self.stdout.write(
+                f'  {label}: {done / options["duration"]:.0f} запросов/с, '
+                f'ошибок: {errors}'
+            )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('По умолчанию (rollback journal, CONN_MAX_AGE = 0)', {},
+             False),
+            ('SQLITE_PRAGMAS, постоянные соединения',
+             settings.SQLITE_PRAGMAS, True),
+        )
+        for title, pragmas, persistent in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(Path(directory) / 'benchmark.sqlite3')
+                self.prepare(path, options['posts'])
+                self.stdout.write(self.style.MIGRATE_HEADING(title))
+                self.run_profile(path, pragmas, persistent, options)
@@ -0,0 +1,35 @@
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.renditions import schedule_renditions
+from core.cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие уменьшенные копии картинок публикаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить и уже существующие копии.',
+        )
+
+    def handle(self, *args, force, **options):
+        posts = Post.objects.exclude(image='').only(
+            'pk', 'image', 'image_width', 'image_height')
+        futures = {}
+        for post in posts.iterator():
+            future = schedule_renditions(post, force=force)
+            if future is not None:
+                futures[future] = post.pk
+        done, _ = wait(futures)
+        built = [futures[f] for f in done if f.exception() is None]
+        # Колбэк пула сбрасывает кэш асинхронно и может не успеть до
+        # выхода из команды.
+        invalidate_tags(*(f'post:{pk}' for pk in built))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {len(built)}, '
+            f'ошибок: {len(done) - len(built)}'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import get_metrics
+
+METRICS = (
+    'page_cache_hit',
+    'page_cache_miss',
+    'page_cache_stale',
+    'page_cache_refresh',
+    'page_cache_updating',
+    'page_cache_degraded',
+    'db_budget_exceeded',
+    'write_batches',
+    'write_queue_full',
+    'search_cache_hit',
+    'search_cache_miss',
+    'search_cache_stale',
+    'search_cache_refresh',
+    'search_cache_updating',
+)
+
+
+class Command(BaseCommand):
+    help = ('Выводит счётчики кэша страниц и поиска, бюджета запросов и '
+            'очереди записи.')
+
+    def handle(self, *args, **options):
+        for name, value in get_metrics(*METRICS).items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.scheduler import get_next_change_time, publish_due_posts
+
+
+class Command(BaseCommand):
+    help = ('Публикует отложенные посты, время которых наступило. '
+            'С --loop работает постоянно, просыпаясь к ближайшей '
+            'публикации.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument(
+            '--max-sleep', type=float, default=60,
+            help=('Наибольшая пауза между проверками, с: пост могут '
+                  'перенести на более раннее время.'),
+        )
+
+    def handle(self, *args, loop, max_sleep, **options):
+        while True:
+            published = publish_due_posts()
+            if published:
+                self.stdout.write(f'Опубликовано постов: {len(published)}')
+            if not loop:
+                break
+            next_change = get_next_change_time()
+            pause = max_sleep
+            if next_change is not None:
+                pause = min(
+                    max_sleep,
+                    (next_change - timezone.now()).total_seconds())
+            time.sleep(max(pause, 0.1))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у публикаций пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько публикаций обновлять в одной транзакции.',
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        last_pk = 0
+        updated = 0
+        while True:
+            post_ids = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not post_ids:
+                break
+            with transaction.atomic():
+                updated += Post.recount_comments(post_ids)
+            last_pk = post_ids[-1]
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано публикаций: {updated}')
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Comment, Post
+from core.cache import invalidate_tags
+from core.constants import TEXT_RENDERER_VERSION
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново готовит HTML текстов публикаций и комментариев, '
+        'отрисованных прежней версией render_text.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько записей обновлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--all', action='store_true', dest='rerender_all',
+            help='Перерисовать все записи, а не только устаревшие.',
+        )
+
+    def handle(self, *args, chunk_size, rerender_all, **options):
+        for model, post_field in ((Post, 'pk'), (Comment, 'post_id')):
+            queryset = model.objects.all()
+            if not rerender_all:
+                queryset = queryset.exclude(
+                    text_html_version=TEXT_RENDERER_VERSION)
+            updated = self.rerender(queryset, post_field, chunk_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: обновлено {updated}'
+            ))
+
+    def rerender(self, queryset, post_field, chunk_size):
+        fields = ('pk', 'text', post_field)
+        last_pk = 0
+        updated = 0
+        while True:
+            items = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only(*fields)[:chunk_size]
+            )
+            if not items:
+                break
+            for item in items:
+                item.render_text_html()
+            with transaction.atomic():
+                queryset.model.objects.bulk_update(
+                    items, ['text_html', 'text_html_version'])
+            # bulk_update не отправляет сигналы: закэшированные страницы
+            # постов сбрасываются здесь.
+            invalidate_tags(*{
+                f'post:{getattr(item, post_field)}' for item in items})
+            updated += len(items)
+            last_pk = items[-1].pk
+        return updated
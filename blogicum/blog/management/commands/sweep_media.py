@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.blobs import sweep_unreferenced
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок, на которые не ссылается ни один '
+            'пост. С --loop повторяет проход с заданным интервалом.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=float, default=24 * 60 * 60,
+            help='Не трогать файлы, изменённые позже, чем столько секунд '
+                 'назад.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument(
+            '--interval', type=float, default=60 * 60,
+            help='Пауза между проходами в режиме --loop, с.',
+        )
+
+    def handle(self, *args, grace, dry_run, loop, interval, **options):
+        while True:
+            removed = sweep_unreferenced(grace, dry_run=dry_run)
+            for name in removed:
+                self.stdout.write(name)
+            self.stdout.write(self.style.SUCCESS(
+                f'{"Найдено" if dry_run else "Удалено"} файлов без ссылок: '
+                f'{len(removed)}'
+            ))
+            if not loop:
+                break
+            time.sleep(interval)
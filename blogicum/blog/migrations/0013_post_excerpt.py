@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-17 05:59
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 10
+EXCERPT_MAX_LENGTH = 512
+
+
+def fill_excerpt(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.only('pk', 'text').iterator(chunk_size=500)
+    batch = []
+    for post in posts:
+        post.excerpt = Truncator(
+            Truncator(post.text).words(EXCERPT_WORDS, truncate=' …')
+        ).chars(EXCERPT_MAX_LENGTH)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_post_is_live'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512, verbose_name='Анонс'),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:03
+
+from django.db import migrations
+
+CREATE_SEARCH_TABLE = """
+CREATE VIRTUAL TABLE blog_post_search USING fts5(
+    title, text, category, location,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+INSERT INTO blog_post_search (rowid, title, text, category, location)
+SELECT post.id, post.title, post.text,
+       COALESCE(category.title, ''), COALESCE(location.name, '')
+FROM blog_post AS post
+LEFT JOIN blog_category AS category ON category.id = post.category_id
+LEFT JOIN blog_location AS location ON location.id = post.location_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_rendered_text'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_SEARCH_TABLE,
+            'DROP TABLE blog_post_search;',
+        ),
+    ]
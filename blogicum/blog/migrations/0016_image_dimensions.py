@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:07
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def fill_image_dimensions(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    # values_list, а не объекты: при создании объекта ImageField сам
+    # открывает файл, чтобы заполнить пустые размеры.
+    images = Post.objects.exclude(image='').values_list('pk', 'image')
+    for pk, name in images.iterator():
+        # Пропавший или нечитаемый файл получает размеры 0, а не NULL.
+        try:
+            with default_storage.open(name) as file:
+                width, height = get_image_dimensions(file)
+        except OSError:
+            width = height = None
+        Post.objects.filter(pk=pk).update(
+            image_width=width or 0, image_height=height or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота фото'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина фото'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', upload_to='post_images', verbose_name='Фото', width_field='image_width'),
+        ),
+        migrations.RunPython(
+            fill_image_dimensions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:46
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def fill_missing_dimensions(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    # Посты, которые 0016 пропустила из-за пропавшего или нечитаемого
+    # файла: размеры 0 означают «неизвестны» и больше не проверяются.
+    images = (
+        Post.objects.exclude(image='')
+        .filter(Q(image_width__isnull=True) | Q(image_height__isnull=True))
+        .values_list('pk', 'image')
+    )
+    for pk, name in images.iterator():
+        try:
+            with default_storage.open(name) as file:
+                width, height = get_image_dimensions(file)
+        except OSError:
+            width = height = None
+        Post.objects.filter(pk=pk).update(
+            image_width=width or 0, image_height=height or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='post_images', verbose_name='Фото'),
+        ),
+        migrations.RunPython(
+            fill_missing_dimensions, migrations.RunPython.noop),
+    ]
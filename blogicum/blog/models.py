@@ -1,7 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.files.images import get_image_dimensions
 from django.db import models
-from core.constants import POST_ORDERING
-from core.models import PublishedCreatedAtModel
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import Truncator
+from core.constants import EXCERPT_MAX_LENGTH, EXCERPT_WORDS, POST_ORDERING
+from core.models import PublishedCreatedAtModel, RenderedTextModel
 
 User = get_user_model()
 
@@ -35,7 +40,7 @@ class Location(PublishedCreatedAtModel):
         return self.name
 
 
-class Post(PublishedCreatedAtModel):
+class Post(PublishedCreatedAtModel, RenderedTextModel):
     title = models.CharField('Название', max_length=256)
     text = models.TextField('Текст')
     pub_date = models.DateTimeField(
@@ -61,19 +66,140 @@ class Post(PublishedCreatedAtModel):
         null=True,
         verbose_name='Категория'
     )
-    image = models.ImageField('Фото', upload_to='post_images',
-                              blank=True)
+    image = models.ImageField('Фото', upload_to='post_images', blank=True)
+    # Заполняются при загрузке (см. update_image_dimensions): шаблонам
+    # нужны размеры картинки, а открывать её ради этого незачем. Не
+    # width_field/height_field: с ними ImageField открывает файл при
+    # каждой загрузке модели, если размеры пусты. 0 — размеры неизвестны.
+    image_width = models.PositiveIntegerField(
+        'Ширина фото', null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота фото', null=True, blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    excerpt = models.CharField(
+        'Анонс',
+        max_length=EXCERPT_MAX_LENGTH,
+        blank=True,
+        default='',
+        editable=False,
+    )
+    is_live = models.BooleanField(
+        'Дата публикации наступила',
+        default=False,
+        editable=False,
+        help_text=('Выставляется при сохранении и планировщиком '
+                   'отложенных публикаций (blog.scheduler).'),
+    )
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = (POST_ORDERING,)
+        # Индексы повторяют форму запросов лент: фильтр по видимости,
+        # сортировка по (pub_date, id) для keyset-пагинации.
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                condition=Q(is_published=True, is_live=True),
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                condition=Q(is_published=True, is_live=True),
+                name='post_category_feed_idx',
+            ),
+            models.Index(
+                fields=('pub_date',),
+                condition=Q(is_live=False),
+                name='post_scheduled_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+            models.Index(fields=('updated_at',), name='post_updated_idx'),
+        )
 
     def __str__(self):
         return self.title
 
-
-class Comment(PublishedCreatedAtModel):
+    def update_image_dimensions(self):
+        """Берёт размеры из только что назначенного файла картинки.
+
+        Загрузка через ProcessedImageField уже знает размеры после
+        перекодирования; иначе читается только заголовок файла.
+        """
+        if not self.image:
+            self.image_width = self.image_height = None
+            return
+        if self.image._committed:
+            return
+        processing = getattr(self.image.file, 'processing', None)
+        if processing is not None:
+            width, height = processing['size']
+        else:
+            width, height = get_image_dimensions(self.image.file)
+        self.image_width, self.image_height = width or 0, height or 0
+
+    def commit_files(self):
+        """Записывает новую картинку в хранилище, не сохраняя пост.
+
+        Вызывается до очереди записи (core.writes): хэширование и запись
+        файла не должны идти под блокировкой записи SQLite. Если пост
+        так и не сохранится, файл уберёт команда sweep_media.
+        """
+        self.update_image_dimensions()
+        if self.image and not self.image._committed:
+            self.image.save(self.image.name, self.image.file, save=False)
+
+    def save(self, *args, **kwargs):
+        self.is_live = self.pub_date <= timezone.now()
+        self.excerpt = self.make_excerpt(self.text)
+        self.update_image_dimensions()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'pub_date' in update_fields:
+                update_fields.add('is_live')
+            if 'text' in update_fields:
+                update_fields.add('excerpt')
+            if 'image' in update_fields:
+                update_fields.update(('image_width', 'image_height'))
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def make_excerpt(text):
+        # То же, что фильтр truncatewords в карточке поста.
+        return Truncator(
+            Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+        ).chars(EXCERPT_MAX_LENGTH)
+
+    @classmethod
+    def recount_comments(cls, post_ids):
+        """Пересчитывает `comment_count` одним UPDATE по индексу post_id.
+
+        `updated_at` тоже обновляется: от комментариев зависят страницы
+        поста, и их валидаторы для условных запросов должны поменяться.
+        """
+        published = (
+            Comment.objects.filter(post=OuterRef('pk'), is_published=True)
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return cls.objects.filter(pk__in=post_ids).update(
+            comment_count=Coalesce(Subquery(published), 0),
+            updated_at=timezone.now(),
+        )
+
+
+class Comment(PublishedCreatedAtModel, RenderedTextModel):
     text = models.TextField('Текст комментария')
     post = models.ForeignKey(
         Post,
@@ -90,6 +216,20 @@ class Comment(PublishedCreatedAtModel):
         verbose_name_plural = "Комментарии"
         ordering = ('created_at',)
         default_related_name = "comments"
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at', 'id'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self):
         return f"Комментарий {self.author}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Нужен, чтобы пересчитать счётчик и у поста, от которого
+        # комментарий перенесли в админке.
+        instance._loaded_post_id = instance.__dict__.get('post_id')
+        return instance
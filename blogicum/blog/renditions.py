@@ -0,0 +1,153 @@
+"""Уменьшенные копии (рендишены) картинок публикаций.
+
+Копии лежат в MEDIA_ROOT/renditions/<ширина>w/ в JPEG, WebP и, если
+Pillow его умеет, AVIF. Строятся они в пуле процессов после сохранения
+поста, так что декодирование фотографий не
+занимает воркер, обрабатывающий запрос. Пока копии нет, шаблоны
+показывают оригинал; когда она появляется, кэш карточек и страниц поста
+сбрасывается.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from PIL import Image
+
+from core.cache import invalidate_tags
+from core.constants import (
+    RENDITION_QUALITY,
+    RENDITION_WIDTHS,
+    RENDITION_WORKERS,
+)
+from core.images import render_renditions
+
+logger = logging.getLogger(__name__)
+
+Image.init()
+# (формат Pillow, расширение, MIME-тип): сначала более компактные.
+# Последний формат понимают все браузеры, он идёт в <img>.
+RENDITION_FORMATS = tuple(
+    image_format for image_format in (
+        ('AVIF', 'avif', 'image/avif'),
+        ('WEBP', 'webp', 'image/webp'),
+    )
+    if image_format[0] in Image.SAVE
+) + (('JPEG', 'jpg', 'image/jpeg'),)
+FALLBACK_EXTENSION = RENDITION_FORMATS[-1][1]
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # spawn, а не fork: копировать процесс веб-сервера с его потоками
+        # и открытыми соединениями небезопасно.
+        _pool = ProcessPoolExecutor(
+            max_workers=RENDITION_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _pool
+
+
+def rendition_name(name, size, extension=FALLBACK_EXTENSION):
+    root, _ = os.path.splitext(name)
+    return f'renditions/{RENDITION_WIDTHS[size]}w/{root}.{extension}'
+
+
+def rendition_names(name):
+    """Имена всех копий картинки во всех размерах и форматах."""
+    return [
+        rendition_name(name, size, extension)
+        for size in RENDITION_WIDTHS
+        for _, extension, _ in RENDITION_FORMATS
+    ]
+
+
+def _original_width(image):
+    # Ширина хранится рядом с картинкой в Post.image_width.
+    return getattr(image.instance, f'{image.field.name}_width', None)
+
+
+def available_renditions(image, extension=FALLBACK_EXTENSION):
+    """Существующие копии картинки: {размер: (URL, ширина)}."""
+    original_width = _original_width(image)
+    renditions = {}
+    for size, width in RENDITION_WIDTHS.items():
+        name = rendition_name(image.name, size, extension)
+        if image.storage.exists(name):
+            # Узкие картинки не увеличиваются: копия бывает уже
+            # номинальной ширины.
+            renditions[size] = (
+                image.storage.url(name),
+                min(width, original_width or width),
+            )
+    return renditions
+
+
+def rendition_url(image, size):
+    """URL копии картинки, а если её ещё нет — URL оригинала."""
+    url, _ = available_renditions(image).get(size, (image.url, None))
+    return url
+
+
+def rendition_srcset(image, renditions, with_original=True):
+    """Значение srcset из доступных копий и, если нужно, оригинала."""
+    candidates = {width: url for url, width in renditions.values()}
+    original_width = _original_width(image)
+    if (with_original and original_width
+            and original_width not in candidates):
+        candidates[original_width] = image.url
+    return ', '.join(
+        f'{url} {width}w' for width, url in sorted(candidates.items()))
+
+
+def rendition_sources(image):
+    """Пары (MIME-тип, srcset) для <source> в компактных форматах."""
+    sources = []
+    for _, extension, mime_type in RENDITION_FORMATS[:-1]:
+        renditions = available_renditions(image, extension)
+        if renditions:
+            sources.append((
+                mime_type,
+                rendition_srcset(image, renditions, with_original=False),
+            ))
+    return sources
+
+
+def missing_renditions(image, force=False):
+    targets = []
+    for size, width in RENDITION_WIDTHS.items():
+        for image_format, extension, _ in RENDITION_FORMATS:
+            name = rendition_name(image.name, size, extension)
+            if force or not image.storage.exists(name):
+                targets.append(
+                    (image.storage.path(name), width, image_format))
+    return targets
+
+
+def _finished(post_pk, future):
+    error = future.exception()
+    if error is not None:
+        logger.warning('Не удалось построить копии картинки поста %s: %s',
+                       post_pk, error)
+        return
+    invalidate_tags(f'post:{post_pk}')
+
+
+def schedule_renditions(post, force=False):
+    """Отправляет недостающие копии картинки поста в пул процессов.
+
+    Возвращает future или None, если строить нечего.
+    """
+    if not post.image:
+        return None
+    targets = missing_renditions(post.image, force=force)
+    if not targets or not post.image.storage.exists(post.image.name):
+        return None
+    future = get_pool().submit(
+        render_renditions, post.image.path, targets, RENDITION_QUALITY)
+    future.add_done_callback(partial(_finished, post.pk))
+    return future
@@ -0,0 +1,188 @@
+"""Полнотекстовый поиск по публикациям на SQLite FTS5.
+
+Индекс `blog_post_search` хранит для каждого поста (rowid = id поста)
+заголовок, текст, название категории и местоположения. Видимость в
+индексе не учитывается — её проверяет запрос выдачи, поэтому снятие с
+публикации и отложенные посты не требуют переиндексации.
+
+Ранжированные списки id кэшируются по нормализованному запросу и
+сбрасываются тегом индекса и тегом лент (от него зависит видимость).
+Фрагменты с подсветкой строятся только для постов показанной страницы.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+from blog.models import Category, Location, Post
+from core.cache import (
+    get_or_set_tagged,
+    get_tag_versions,
+    get_tagged,
+    incr_metric,
+    invalidate_tags,
+    make_key,
+    set_tagged,
+)
+from core.constants import (
+    SEARCH_CACHE_TIMEOUT,
+    SEARCH_ID_CHUNK_SIZE,
+    SEARCH_MAX_RESULTS,
+    SEARCH_SNIPPET_TOKENS,
+)
+
+SEARCH_TABLE = 'blog_post_search'
+SEARCH_INDEX_TAG = 'search-index'
+# Границы подсветки в выдаче snippet(): управляющие символы не
+# встречаются в тексте и переживают экранирование HTML.
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+# Веса столбцов для bm25: заголовок, текст, категория, местоположение.
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 3.0)
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_query(query):
+    return ' '.join(TOKEN_RE.findall(query.lower()))
+
+
+def match_expression(normalized):
+    # Каждое слово берётся в кавычки, чтобы пользовательский ввод не
+    # превращался в синтаксис FTS5 (OR, NEAR, фильтры столбцов), а `*`
+    # находит и другие формы слова с тем же началом.
+    return ' '.join(f'"{token}"*' for token in normalized.split())
+
+
+def _index_sql(where):
+    return (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, title, text, category, location)'
+        ' SELECT post.id, post.title, post.text,'
+        " COALESCE(category.title, ''), COALESCE(location.name, '')"
+        f' FROM {Post._meta.db_table} AS post'
+        f' LEFT JOIN {Category._meta.db_table} AS category'
+        ' ON category.id = post.category_id'
+        f' LEFT JOIN {Location._meta.db_table} AS location'
+        ' ON location.id = post.location_id'
+        f' WHERE {where}'
+    )
+
+
+def index_posts(posts):
+    """Переиндексирует посты из queryset `posts`.
+
+    Выборка постов подставляется в SQL подзапросом, поэтому смена
+    названия категории обходится двумя запросами на любое число постов.
+    """
+    sql, params = posts.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({sql})', params)
+        cursor.execute(_index_sql(f'post.id IN ({sql})'), params)
+    invalidate_tags(SEARCH_INDEX_TAG)
+
+
+def remove_posts(post_ids):
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})',
+            post_ids,
+        )
+    invalidate_tags(SEARCH_INDEX_TAG)
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(_index_sql('1'))
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        indexed = cursor.fetchone()[0]
+    invalidate_tags(SEARCH_INDEX_TAG)
+    return indexed
+
+
+def search_ranked(query, visible_posts, limit=SEARCH_MAX_RESULTS):
+    """Список пар (вес bm25, id) видимых постов, лучшие первыми.
+
+    Чем меньше вес, тем выше пост в выдаче. `visible_posts` — queryset
+    с правилами видимости, из него берутся только id найденных постов.
+    """
+    match = match_expression(normalize_query(query))
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT bm25({SEARCH_TABLE}, %s, %s, %s, %s) AS score, rowid'
+            f' FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+            ' ORDER BY score, rowid LIMIT %s',
+            (*BM25_WEIGHTS, match, limit),
+        )
+        ranked = cursor.fetchall()
+    ids = [pk for _, pk in ranked]
+    visible = set()
+    # Порциями: до SQLite 3.32 в запросе не больше 999 параметров.
+    for start in range(0, len(ids), SEARCH_ID_CHUNK_SIZE):
+        visible.update(
+            visible_posts.order_by()
+            .filter(pk__in=ids[start:start + SEARCH_ID_CHUNK_SIZE])
+            .values_list('pk', flat=True)
+        )
+    return [(score, pk) for score, pk in ranked if pk in visible]
+
+
+def search_posts(query, visible_posts):
+    """То же, что search_ranked, но через кэш.
+
+    Ключ строится только по запросу, поэтому `visible_posts` должен
+    задавать общие для всех посетителей правила видимости.
+    """
+    normalized = normalize_query(query)
+    if not normalized:
+        return []
+    tags = (SEARCH_INDEX_TAG, 'post-list')
+    ranked, status = get_or_set_tagged(
+        make_key('search', normalized),
+        lambda: (
+            search_ranked(normalized, visible_posts),
+            tags,
+            SEARCH_CACHE_TIMEOUT,
+        ),
+        known_tags=tags,
+    )
+    incr_metric(f'search_cache_{status.lower()}')
+    return ranked
+
+
+def _highlight(fragment):
+    return escape(fragment).replace(
+        HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+def get_snippets(query, post_ids):
+    """Фрагменты текста с подсветкой совпадений: {id поста: HTML}."""
+    match = match_expression(normalize_query(query))
+    post_ids = list(post_ids)
+    if not (match and post_ids):
+        return {}
+    key = make_key('search-snippets', match, *post_ids)
+    snippets, _ = get_tagged(key)
+    if snippets is not None:
+        return snippets
+    known_versions = get_tag_versions((SEARCH_INDEX_TAG,))
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, %s, %s)'
+            f' FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+            f' AND rowid IN ({placeholders})',
+            (HIGHLIGHT_START, HIGHLIGHT_END, '…', SEARCH_SNIPPET_TOKENS,
+             match, *post_ids),
+        )
+        snippets = {pk: _highlight(raw) for pk, raw in cursor.fetchall()}
+    set_tagged(key, snippets, (SEARCH_INDEX_TAG,),
+               timeout=SEARCH_CACHE_TIMEOUT, known_versions=known_versions)
+    return snippets
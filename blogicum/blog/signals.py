@@ -0,0 +1,103 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from blog.models import Category, Comment, Location, Post
+from blog.renditions import schedule_renditions
+from blog.scheduler import reset_next_change_time
+from blog.search import index_posts, remove_posts
+from core.cache import invalidate_tags
+from core.pagination import bump_count_generation
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def update_comment_count(sender, instance, **kwargs):
+    post_ids = {instance.post_id, getattr(instance, '_loaded_post_id', None)}
+    post_ids.discard(None)
+    Post.recount_comments(post_ids)
+    instance._loaded_post_id = instance.post_id
+    invalidate_tags(*(f'post:{post_id}' for post_id in post_ids))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    reset_next_change_time()
+    bump_count_generation()
+    invalidate_tags('post-list', f'post:{instance.pk}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    bump_count_generation()
+    invalidate_tags('post-list', f'category:{instance.pk}')
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location(sender, instance, **kwargs):
+    invalidate_tags(f'location:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, update_fields=None, **kwargs):
+    # При входе на сайт обновляется только last_login — он на страницах
+    # не выводится.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Имя автора выводится и в списках постов: тег `authors` меняет их
+    # валидаторы (см. `ConditionalGetMixin`).
+    invalidate_tags(f'author:{instance.pk}', 'authors')
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    index_posts(Post.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_category_posts(sender, instance, created, **kwargs):
+    if not created:
+        index_posts(Post.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Location)
+def index_location_posts(sender, instance, created, **kwargs):
+    if not created:
+        index_posts(Post.objects.filter(location=instance))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Location)
+def remember_indexed_posts(sender, instance, **kwargs):
+    # После удаления у постов обнулится внешний ключ, и найти их по нему
+    # будет нельзя — запоминаем заранее.
+    field = 'category' if sender is Category else 'location'
+    instance._indexed_post_ids = list(
+        Post.objects.filter(**{field: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def reindex_orphaned_posts(sender, instance, **kwargs):
+    post_ids = getattr(instance, '_indexed_post_ids', [])
+    if post_ids:
+        index_posts(Post.objects.filter(pk__in=post_ids))
+
+
+@receiver(post_save, sender=Post)
+def build_post_renditions(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(schedule_renditions, instance))
@@ -0,0 +1,71 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blog.renditions import (
+    available_renditions,
+    rendition_sources,
+    rendition_srcset,
+)
+from core.cache import get_tag_versions, make_key
+from core.constants import POST_CARD_CACHE_TIMEOUT
+from core.mixins import post_cache_tags
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Возвращает HTML карточек постов, собранный из кэша.
+
+    Ключ карточки включает версии тегов поста, его автора, категории и
+    местоположения, а также число комментариев: любое их изменение
+    даёт новый ключ, а старая запись просто перестаёт читаться.
+    """
+    posts = list(posts)
+    tags = {post.pk: post_cache_tags(post) for post in posts}
+    versions = get_tag_versions(
+        {tag for post_tags in tags.values() for tag in post_tags})
+    keys = {
+        post.pk: make_key(
+            'post-card', post.pk, post.comment_count,
+            *(versions[tag] for tag in tags[post.pk]),
+        )
+        for post in posts
+    }
+    cards = cache.get_many(keys.values())
+    missing = {}
+    for post in posts:
+        if keys[post.pk] not in cards:
+            missing[keys[post.pk]] = render_to_string(
+                'includes/post_card.html', {'post': post})
+    if missing:
+        cache.set_many(missing, POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[keys[post.pk]]) for post in posts]
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, size, lazy=True):
+    """Картинка поста с копией нужного размера, srcset и размерами.
+
+    Копии в WebP/AVIF предлагаются браузеру через <source>, он сам
+    выбирает поддерживаемый формат. Пока копии не построены, выводится
+    оригинал.
+    """
+    renditions = available_renditions(post.image)
+    src, _ = renditions.get(size, (post.image.url, None))
+    return {
+        'src': src,
+        'srcset': rendition_srcset(post.image, renditions),
+        'sources': rendition_sources(post.image),
+        'width': post.image_width,
+        'height': post.image_height,
+        'lazy': lazy,
+    }
+
+
+@register.filter
+def zip_with(items, others):
+    return zip(items, others)
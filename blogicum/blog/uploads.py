@@ -0,0 +1,178 @@
+"""Обработка картинок, загружаемых к публикациям.
+
+Загрузка больше FILE_UPLOAD_MAX_MEMORY_SIZE пишется во временный файл,
+а не держится в памяти. Затем заголовок проверяется на формат и число
+пикселей, и только после этого картинка декодируется — в отдельном
+процессе из пула ограниченного размера. Так пиковая память веб-воркера
+не зависит от размера фотографии, а общая — от числа одновременных
+загрузок. Память процесса пула ограничена UPLOAD_MEMORY_LIMIT, а пиковый
+RSS в журнале относится к одной загрузке. На Python 3.11+ каждый процесс
+выполняет одно задание, и после большой загрузки память возвращается
+системе; на более старых версиях (max_tasks_per_child там нет) процессы
+переиспользуются.
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+
+from core.constants import (
+    UPLOAD_IMAGE_FORMATS,
+    UPLOAD_MAX_PIXELS,
+    UPLOAD_MAX_SIDE,
+    UPLOAD_MEMORY_LIMIT,
+    UPLOAD_QUALITY,
+    UPLOAD_TIMEOUT,
+    UPLOAD_WORKERS,
+)
+from core.images import limit_memory, read_header, reencode_image
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png'}
+
+_pool = None
+# Параметр max_tasks_per_child появился в Python 3.11.
+_POOL_OPTIONS = (
+    {'max_tasks_per_child': 1} if sys.version_info >= (3, 11) else {})
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=UPLOAD_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=limit_memory,
+            initargs=(UPLOAD_MEMORY_LIMIT,),
+            **_POOL_OPTIONS,
+        )
+    return _pool
+
+
+def reset_pool():
+    # Упавший процесс ломает пул целиком — следующий запрос создаст новый.
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _temporary_file(suffix):
+    return tempfile.NamedTemporaryFile(
+        suffix=suffix, dir=settings.FILE_UPLOAD_TEMP_DIR)
+
+
+class ProcessedImageField(forms.ImageField):
+    """ImageField, который проверяет и перекодирует загрузку.
+
+    Вместо загруженного файла в cleaned_data попадает перекодированная
+    копия без EXIF, уменьшенная до UPLOAD_MAX_SIDE.
+    """
+
+    default_error_messages = {
+        'invalid_format': 'Поддерживаются только форматы %(formats)s.',
+        'too_large': (
+            'Слишком большое изображение: допустимо не больше '
+            '%(limit)s мегапикселей.'
+        ),
+        'busy': 'Не удалось обработать изображение, попробуйте позже.',
+    }
+
+    def to_python(self, data):
+        # Проверки FileField (имя, пустой файл), но не полная проверка
+        # ImageField: она декодировала бы картинку в этом процессе.
+        data = forms.FileField.to_python(self, data)
+        if data is None:
+            return None
+        source = None
+        path = getattr(data, 'temporary_file_path', None)
+        if path is None:
+            # Небольшие загрузки приходят в памяти — пулу нужен путь.
+            source = _temporary_file('.upload')
+            for chunk in data.chunks():
+                source.write(chunk)
+            source.flush()
+            path = source.name
+        else:
+            path = path()
+        try:
+            self.check_header(path)
+            return self.reencode(path, data.name)
+        finally:
+            if source is not None:
+                source.close()
+
+    def too_large_error(self):
+        return forms.ValidationError(
+            self.error_messages['too_large'], code='too_large',
+            params={'limit': UPLOAD_MAX_PIXELS // 1_000_000},
+        )
+
+    def check_header(self, path):
+        too_large = self.too_large_error()
+        try:
+            image_format, (width, height) = read_header(path)
+        except Image.DecompressionBombError:
+            raise too_large
+        except Exception as error:
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image',
+            ) from error
+        if image_format not in UPLOAD_IMAGE_FORMATS:
+            raise forms.ValidationError(
+                self.error_messages['invalid_format'],
+                code='invalid_format',
+                params={'formats': ', '.join(UPLOAD_IMAGE_FORMATS)},
+            )
+        if width * height > UPLOAD_MAX_PIXELS:
+            raise too_large
+
+    def reencode(self, path, name):
+        target = _temporary_file('.image')
+        future = get_pool().submit(
+            reencode_image, path, target.name, UPLOAD_MAX_SIDE,
+            UPLOAD_QUALITY)
+        try:
+            result = future.result(timeout=UPLOAD_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            target.close()
+            raise forms.ValidationError(
+                self.error_messages['busy'], code='busy')
+        except (MemoryError, BrokenProcessPool) as error:
+            # Перекодирование не уложилось в UPLOAD_MEMORY_LIMIT.
+            target.close()
+            if isinstance(error, BrokenProcessPool):
+                reset_pool()
+            raise self.too_large_error() from error
+        except Exception as error:
+            target.close()
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image',
+            ) from error
+        logger.info(
+            'Загрузка %s перекодирована в %s %s×%s, пиковый RSS '
+            'процесса %s КиБ', name, result['format'], *result['size'],
+            result['peak_rss_kib'],
+        )
+        stem, _ = os.path.splitext(os.path.basename(name))
+        target.seek(0, os.SEEK_END)
+        processed = UploadedFile(
+            file=target,
+            name=f'{stem}.{EXTENSIONS[result["format"]]}',
+            content_type=Image.MIME[result['format']],
+            size=target.tell(),
+        )
+        processed.seek(0)
+        processed.processing = result
+        return processed
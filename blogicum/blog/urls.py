@@ -14,6 +14,10 @@ urlpatterns = [
          views.CategoryListView.as_view(),
          name='category_posts'
          ),
+    path('search/',
+         views.PostSearchView.as_view(),
+         name='search'
+         ),
     # РАБОТА С ПРОФИЛЕМ
     path('profile/<username>/',
          views.ProfileListView.as_view(),
@@ -42,6 +46,10 @@ urlpatterns = [
          name='delete_post'
          ),
     # РАБОТА С КОММЕНТАРИЯМИ
+    path('posts/<int:pk>/comments/',
+         views.PostCommentsView.as_view(),
+         name='post_comments'
+         ),
     path('posts/<int:pk>/comment/',
          views.CommentCreateView.as_view(),
          name='add_comment'
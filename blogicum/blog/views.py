@@ -1,8 +1,8 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
-from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
 from django.views.generic import (
     CreateView,
     DeleteView,
@@ -11,13 +11,28 @@ from django.views.generic import (
     UpdateView,
 )
 from blog.models import Category, Comment, Post, User
-from core.constants import POST_ORDERING
+from core.cache import get_tag_versions
+from core.constants import POST_CURSOR_ORDERING, POSTS_PER_PAGE
+from core.pagination import RankedCursorPaginator
 from core.mixins import (
+    AnonymousPageCacheMixin,
     CommentMixin,
+    ConditionalGetMixin,
+    CursorPaginationMixin,
+    PostCommentsMixin,
     PostMixin,
     AddAuthorMixin,
     PostQuerySet,
-    OnlyAuthorMixin
+    OnlyAuthorMixin,
+    QueuedDeleteMixin,
+    QueuedSaveMixin,
+    ScheduledPublicationMixin,
+)
+from .search import (
+    SEARCH_INDEX_TAG,
+    get_snippets,
+    normalize_query,
+    search_posts,
 )
 from .forms import (
     CommentForm,
@@ -26,25 +41,67 @@ from .forms import (
 
 
 # РАБОТА С ПОСТАМИ.
-class PostDetailView(DetailView):
+class PostDetailView(AnonymousPageCacheMixin, ConditionalGetMixin,
+                     PostCommentsMixin, DetailView):
     model = Post
     template_name = "blog/detail.html"
 
+    def get_page_cache_base_tags(self):
+        return (f"post:{self.kwargs['pk']}",)
+
+    def get_queryset(self):
+        return Post.objects.select_related("author", "category", "location")
+
+    def get_object(self, queryset=None):
+        # Пост вместе со связанными объектами загружается один раз и
+        # используется и для проверки доступа, и для валидаторов, и для
+        # шаблона.
+        if getattr(self, "object", None) is None:
+            self.object = self.check_post_visibility(
+                super().get_object(queryset))
+        return self.object
+
+    def get_last_modified(self):
+        post = self.get_object()
+        return max(
+            related.updated_at
+            for related in (post, post.category, post.location)
+            if related is not None
+        )
+
+    def get_etag_parts(self):
+        return tuple(get_tag_versions(
+            (f"author:{self.get_object().author_id}",)).values())
+
+    def get_last_modified_tags(self):
+        post = self.get_object()
+        return (f"post:{post.pk}", f"author:{post.author_id}")
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["form"] = CommentForm()
-        context["comments"] = self.object.comments.select_related("author")
+        context["comments"] = self.get_comments_page(self.object)
         return context
 
-    def dispatch(self, request, *args, **kwargs):
-        instance = get_object_or_404(Post, pk=self.kwargs["pk"])
-        if instance.author != self.request.user and not instance.is_published:
-            raise Http404("Страница не найдена")
-        return super().dispatch(request, *args, **kwargs)
+
+class PostCommentsView(PostCommentsMixin, DetailView):
+    """Следующая порция комментариев поста в виде HTML-фрагмента."""
+
+    model = Post
+    template_name = "includes/comment_list.html"
+
+    def get_object(self, queryset=None):
+        return self.check_post_visibility(super().get_object(queryset))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["comments"] = self.get_comments_page(
+            self.object, after=self.request.GET.get("after"))
+        return context
 
 
 class PostCreateView(LoginRequiredMixin,
-                     AddAuthorMixin, PostMixin, CreateView):
+                     AddAuthorMixin, PostMixin, QueuedSaveMixin, CreateView):
     def get_success_url(self):
         return reverse(
             "blog:profile",
@@ -55,7 +112,7 @@ class PostCreateView(LoginRequiredMixin,
 
 
 class PostUpdateView(OnlyAuthorMixin,
-                     AddAuthorMixin, PostMixin, UpdateView):
+                     AddAuthorMixin, PostMixin, QueuedSaveMixin, UpdateView):
     def get_success_url(self):
         return reverse("blog:profile",
                        kwargs={"username": self.request.user.username})
@@ -65,7 +122,8 @@ class PostUpdateView(OnlyAuthorMixin,
 
 
 class PostDeleteView(OnlyAuthorMixin,
-                     PostMixin, LoginRequiredMixin, DeleteView):
+                     PostMixin, LoginRequiredMixin, QueuedDeleteMixin,
+                     DeleteView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["form"] = PostForm(instance=self.object)
@@ -81,7 +139,7 @@ class PostDeleteView(OnlyAuthorMixin,
 
 
 # РАБОТА С КОММЕНТАРИЯМИ.
-class CommentCreateView(LoginRequiredMixin, CreateView):
+class CommentCreateView(LoginRequiredMixin, QueuedSaveMixin, CreateView):
     model = Comment
     template_name = "blog/comment.html"
     form_class = CommentForm
@@ -95,11 +153,11 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         return reverse("blog:post_detail", args=[self.kwargs["pk"]])
 
 
-class CommentUpdateView(CommentMixin, UpdateView):
+class CommentUpdateView(CommentMixin, QueuedSaveMixin, UpdateView):
     form_class = CommentForm
 
 
-class CommentDeleteView(CommentMixin, DeleteView):
+class CommentDeleteView(CommentMixin, QueuedDeleteMixin, DeleteView):
     pass
 
 
@@ -119,8 +177,10 @@ class UserUpdateView(LoginRequiredMixin, UpdateView):
                        kwargs={"username": self.request.user.username})
 
 
-class ProfileListView(PostQuerySet, ListView):
-    paginate_by = 10
+class ProfileListView(ScheduledPublicationMixin, AnonymousPageCacheMixin,
+                      ConditionalGetMixin, CursorPaginationMixin,
+                      PostQuerySet, ListView):
+    paginate_by = POSTS_PER_PAGE
     template_name = "blog/profile.html"
     model = Post
 
@@ -133,16 +193,29 @@ class ProfileListView(PostQuerySet, ListView):
                                          username=self.kwargs["username"])
 
         queryset = (
-            queryset.filter(author=self.profile)
-            .annotate(comment_count=Count("comments"))
-            .order_by(POST_ORDERING)
+            queryset.select_related("author", "location", "category")
+            .defer("text")
+            .filter(author=self.profile)
+            .order_by(*POST_CURSOR_ORDERING)
         )
         if self.request.user != self.profile:
-            queryset = super().get_queryset().annotate(
-                comment_count=Count("comments"))
+            queryset = super().get_queryset().filter(author=self.profile)
 
         return queryset
 
+    def get_etag_parts(self):
+        profile = self.get_object()
+        return (*super().get_etag_parts(),
+                *get_tag_versions((f"author:{profile.pk}",)).values())
+
+    def get_count_cache_key(self):
+        scope = "own" if self.request.user == self.profile else "public"
+        return f"profile:{self.profile.pk}:{scope}"
+
+    def get_page_cache_tags(self, context):
+        return {*super().get_page_cache_tags(context),
+                f"author:{self.profile.pk}"}
+
     def get_context_data(self, **kwargs):
         return dict(**super().get_context_data(**kwargs),
                     profile=self.get_object())
@@ -151,18 +224,22 @@ class ProfileListView(PostQuerySet, ListView):
 # НАРАБОТКИ ПРОШЛОГО СПРИНТА.
 
 
-class PostListView(PostQuerySet, ListView):
-    paginate_by = 10
+class PostListView(ScheduledPublicationMixin, AnonymousPageCacheMixin,
+                   ConditionalGetMixin, CursorPaginationMixin, PostQuerySet,
+                   ListView):
+    paginate_by = POSTS_PER_PAGE
     template_name = "blog/index.html"
 
-    def get_queryset(self):
-        return super().get_queryset().annotate(comment_count=Count("comments"))
+    def get_count_cache_key(self):
+        return "feed"
 
 
-class CategoryListView(PostQuerySet, ListView):
+class CategoryListView(ScheduledPublicationMixin, AnonymousPageCacheMixin,
+                       ConditionalGetMixin, CursorPaginationMixin,
+                       PostQuerySet, ListView):
     template_name = "blog/category.html"
     context_object_name = "post_list"
-    paginate_by = 10
+    paginate_by = POSTS_PER_PAGE
     category = None
 
     def get_queryset(self):
@@ -174,7 +251,46 @@ class CategoryListView(PostQuerySet, ListView):
                 category__slug=self.kwargs["category_slug"])
         )
 
+    def get_count_cache_key(self):
+        return f"category:{self.category.pk}"
+
+    def get_page_cache_tags(self, context):
+        return {*super().get_page_cache_tags(context),
+                f"category:{self.category.pk}"}
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["category"] = self.category
         return context
+
+
+class PostSearchView(ScheduledPublicationMixin, AnonymousPageCacheMixin,
+                     PostQuerySet, ListView):
+    template_name = "blog/search.html"
+    paginate_by = POSTS_PER_PAGE
+    page_cache_base_tags = ("post-list", SEARCH_INDEX_TAG)
+
+    def get_queryset(self):
+        self.query = normalize_query(self.request.GET.get("q", ""))
+        return super().get_queryset()
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = RankedCursorPaginator(
+            search_posts(self.query, queryset), queryset, page_size)
+        page = paginator.page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        posts = context["page_obj"] or ()
+        snippets = get_snippets(self.query, [post.pk for post in posts])
+        context.update(
+            search_query=self.query,
+            # Параметры, которые ссылки пагинатора сохраняют.
+            querystring=urlencode({"q": self.query}) if self.query else "",
+            snippets=[mark_safe(snippets.get(post.pk, "")) for post in posts],
+        )
+        return context
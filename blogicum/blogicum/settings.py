@@ -35,6 +35,7 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'core.apps.CoreConfig',
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
     'django.contrib.admin',
@@ -86,9 +87,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, а не открывается каждый раз.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Прагмы для каждого нового соединения с SQLite (см. core.db). Пустой
+# словарь оставляет настройки SQLite по умолчанию.
+SQLITE_PRAGMAS = {
+    # Читатели не блокируют писателя и друг друга.
+    'journal_mode': 'wal',
+    # В режиме WAL fsync при каждой фиксации не нужен: после сбоя питания
+    # теряются лишь последние транзакции, база остаётся целой.
+    'synchronous': 'normal',
+    # Сколько ждать освобождения блокировки записи, мс.
+    'busy_timeout': 5000,
+    # Кэш страниц соединения: отрицательное значение — в КиБ.
+    'cache_size': -32000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,6 +158,42 @@ STATICFILES_DIRS = [
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20_000,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            # Ключи для согласования процессов (см. core.cache,
+            # core.pagination, blog.scheduler) читаются только из файлов.
+            'LOCAL_EXCLUDE_PREFIXES': (
+                'tag-version:',
+                'metric:',
+                'paginator-count:generation',
+                'scheduler:',
+                'cache-lock:',
+            ),
+        },
+    },
+}
+
 MEDIA_ROOT = BASE_DIR / 'media'
 
+MEDIA_URL = '/media/'
+
+# Передать отправку медиафайлов веб-серверу: 'X-Sendfile' (Apache,
+# lighttpd) или 'X-Accel-Redirect' (nginx). None — отдавать из Django.
+MEDIA_SENDFILE_HEADER = None
+# internal-location nginx, который смотрит в MEDIA_ROOT.
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Файлы называются по хэшу содержимого и не дублируются (core.storage).
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Загрузки больше этого размера пишутся во временный файл, а не в память.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
 TIME_ZONE = 'Europe/Moscow'
@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.forms import UserCreationForm
 from django.urls import include, path, reverse_lazy
 from django.views.generic.edit import CreateView
 
+from core.media import serve_media
+
 handler404 = 'pages.views.page_not_found'
 handler403 = 'pages.views.page_forbidden'
 handler500 = 'pages.views.server_error'
@@ -20,5 +23,7 @@ urlpatterns = [
         ),
         name='registration',
     ),
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media,
+         name='media'),
     path('', include('blog.urls')),
 ]
@@ -0,0 +1,213 @@
+import hashlib
+import math
+import random
+import time
+import uuid
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.constants import (
+    CACHE_LOCK_POLL_INTERVAL,
+    CACHE_LOCK_TIMEOUT,
+    CACHE_LOCK_WAIT,
+    CACHE_STALE_GRACE,
+    CACHE_XFETCH_BETA,
+)
+
+TAG_VERSION_PREFIX = 'tag-version:'
+METRIC_PREFIX = 'metric:'
+LOCK_PREFIX = 'cache-lock:'
+
+HIT = 'HIT'
+MISS = 'MISS'
+STALE = 'STALE'
+# Запись ещё свежая, но пересчитана заранее (XFetch).
+REFRESH = 'REFRESH'
+# Отдана устаревшая запись, пока её пересчитывает другой процесс.
+UPDATING = 'UPDATING'
+# Отдана устаревшая запись, потому что пересчитать её не удалось.
+DEGRADED = 'DEGRADED'
+
+
+def _new_version():
+    # Случайная версия вместо счётчика: если ключ версии вытеснят из
+    # кэша, записи со старой версией всё равно окажутся устаревшими.
+    # Впереди — момент сброса, по нему считается Last-Modified.
+    return f'{time.time_ns():x}-{uuid.uuid4().hex}'
+
+
+def tag_version_time(version):
+    """Момент сброса тега (Unix time, с), записанный в его версии."""
+    stamp, separator, _ = version.partition('-')
+    return int(stamp, 16) / 1e9 if separator else 0
+
+
+def get_tag_versions(tags):
+    keys = {f'{TAG_VERSION_PREFIX}{tag}': tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {tag: found[key] for key, tag in keys.items()}
+
+
+def repeat_on_commit(func, *args):
+    """Вызывает `func(*args)` сразу и ещё раз после фиксации транзакции.
+
+    Пока транзакция не зафиксирована, другие соединения читают старые
+    данные: запрос, пришедший между сбросом и фиксацией, сохранил бы
+    старую страницу уже под новой версией тега. Повторный сброс после
+    фиксации делает такие записи устаревшими, а немедленный — нужен,
+    чтобы само пишущее соединение не получило из кэша старое.
+    """
+    func(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(func, *args))
+
+
+def _bump_tag_versions(tags):
+    cache.set_many(
+        {f'{TAG_VERSION_PREFIX}{tag}': _new_version() for tag in tags},
+        timeout=None,
+    )
+
+
+def invalidate_tags(*tags):
+    repeat_on_commit(_bump_tag_versions, tags)
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def _should_refresh_early(expires_at, delta):
+    # XFetch: чем ближе срок и дольше вычисление, тем вероятнее, что
+    # запрос пересчитает запись заранее — один, а не все сразу.
+    gap = -delta * CACHE_XFETCH_BETA * math.log(1.0 - random.random())
+    return time.time() + gap >= expires_at
+
+
+def _read_tagged(key):
+    """Возвращает пару (запись, статус) без учёта блокировок.
+
+    Запись считается устаревшей (STALE), если истёк её срок или с момента
+    сохранения версия хотя бы одного из её тегов поменялась.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None, MISS
+    _, versions, expires_at, delta = entry
+    if get_tag_versions(versions) != versions:
+        return entry, STALE
+    if expires_at is not None:
+        if time.time() >= expires_at:
+            return entry, STALE
+        if _should_refresh_early(expires_at, delta):
+            return entry, REFRESH
+    return entry, HIT
+
+
+def get_tagged(key):
+    """Возвращает пару (значение, статус) для записи с тегами.
+
+    Для устаревшей записи значение — None.
+    """
+    entry, status = _read_tagged(key)
+    if status in (HIT, REFRESH):
+        return entry[0], HIT
+    return None, status
+
+
+def get_last_tagged(key):
+    """Последнее сохранённое значение записи, даже устаревшее, или None."""
+    entry = cache.get(key)
+    return None if entry is None else entry[0]
+
+
+def set_tagged(key, value, tags, timeout=None, known_versions=None,
+               delta=0, grace=CACHE_STALE_GRACE):
+    """Сохраняет значение вместе с текущими версиями тегов.
+
+    `known_versions` — версии, прочитанные до вычисления значения: если
+    тег успели сбросить во время вычисления, запись сразу устареет.
+    `delta` — сколько секунд заняло вычисление. Запись хранится на
+    `grace` секунд дольше срока, чтобы её можно было отдать, пока идёт
+    пересчёт.
+    """
+    versions = get_tag_versions(set(tags))
+    versions.update(known_versions or {})
+    if timeout is None:
+        expires_at = None
+    else:
+        expires_at = time.time() + timeout
+        timeout += grace
+    cache.set(key, (value, versions, expires_at, delta), timeout)
+
+
+def _wait_for_fresh(key, lock_key):
+    deadline = time.monotonic() + CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(CACHE_LOCK_POLL_INTERVAL)
+        entry, status = _read_tagged(key)
+        if status in (HIT, REFRESH):
+            return entry
+        if cache.get(lock_key) is None:
+            break
+    return None
+
+
+def get_or_set_tagged(key, compute, known_tags=(),
+                      grace=CACHE_STALE_GRACE):
+    """Возвращает (значение, статус), вычисляя значение одним процессом.
+
+    `compute()` возвращает тройку (значение, теги, время жизни); значение
+    None не сохраняется. Пересчёт устаревшей или отсутствующей записи
+    выполняет тот, кто первым взял блокировку ключа. Остальные получают
+    устаревшее значение (UPDATING), а если его нет — ждут результата до
+    CACHE_LOCK_WAIT секунд и только потом считают сами.
+    `known_tags` — теги, версии которых читаются до вычисления.
+    """
+    entry, status = _read_tagged(key)
+    if status == HIT:
+        return entry[0], HIT
+    lock_key = f'{LOCK_PREFIX}{key}'
+    locked = cache.add(lock_key, True, CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry[0], HIT if status == REFRESH else UPDATING
+        entry = _wait_for_fresh(key, lock_key)
+        if entry is not None:
+            return entry[0], HIT
+    try:
+        known_versions = get_tag_versions(known_tags)
+        started = time.monotonic()
+        value, tags, timeout = compute()
+        if value is not None:
+            set_tagged(key, value, tags, timeout,
+                       known_versions=known_versions,
+                       delta=time.monotonic() - started, grace=grace)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value, status
+
+
+def incr_metric(name):
+    key = f'{METRIC_PREFIX}{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_metrics(*names):
+    values = cache.get_many(f'{METRIC_PREFIX}{name}' for name in names)
+    return {
+        name: values.get(f'{METRIC_PREFIX}{name}', 0) for name in names
+    }
@@ -0,0 +1,415 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим кэшем в SQLite.
+
+Общий уровень — SQLiteCache, отдельная база SQLite в каталоге LOCATION:
+её видят все процессы веб-сервера и команды, поэтому сброс тегов
+(core.cache.invalidate_tags) в одном процессе сразу действует в
+остальных. Запись в неё — одна операция по первичному ключу, без обхода
+всех записей, как у FileBasedCache; лишнее удаляется раз в CULL_EVERY
+записей. `incr` и `add` атомарны между процессами: в новых версиях
+SQLite это один запрос, в старых — транзакция BEGIN IMMEDIATE.
+Локальный уровень держит ограниченное число записей недолго
+(LOCAL_TIMEOUT) и экономит чтение и распаковку на горячих ключах.
+
+Ключи, через которые процессы согласуют состояние, — версии тегов,
+счётчики, поколения — в локальный уровень не попадают (настройка
+LOCAL_EXCLUDE_PREFIXES): их устаревшая копия сломала бы инвалидацию.
+Остальные записи либо неизменяемы (в ключ входят версии тегов), либо
+проверяются по версиям тегов при чтении, так что короткой жизни
+локальной копии достаточно.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Потокобезопасный LRU с временем жизни записей.
+
+    Значения хранятся сериализованными, как в LocMemCache, чтобы
+    изменение полученного объекта не меняло закэшированный.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, lifetime):
+        if lifetime <= 0:
+            self.delete(key)
+            return
+        item = (time.monotonic() + lifetime,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._data[key] = item
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(BaseCache):
+    """Бэкенд Django: таблица в отдельной базе SQLite (режим WAL).
+
+    Целые числа хранятся как INTEGER, чтобы `incr` выполнялся одним
+    UPDATE, остальные значения — как pickle. Каждый поток открывает своё
+    соединение. OPTIONS: MAX_ENTRIES и CULL_FREQUENCY — как у встроенных
+    бэкендов; CULL_EVERY — через сколько записей проверять размер.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS cache ('
+        ' key TEXT PRIMARY KEY, value BLOB, expires REAL'
+        ') WITHOUT ROWID',
+        'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    )
+    PRAGMAS = (
+        'PRAGMA journal_mode = wal',
+        'PRAGMA synchronous = normal',
+        'PRAGMA busy_timeout = 5000',
+    )
+    ALIVE = '(expires IS NULL OR expires > ?)'
+    # UPDATE ... RETURNING появился в SQLite 3.35, ON CONFLICT DO UPDATE —
+    # в 3.24; на старых версиях те же операции идут в транзакции.
+    HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+    HAS_UPSERT = sqlite3.sqlite_version_info >= (3, 24)
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.cull_every = int(options.get('CULL_EVERY', 1000))
+        self.path = os.path.join(location, 'cache.sqlite3')
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        # После fork соединение родителя использовать нельзя.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False)
+            for statement in self.PRAGMAS + self.SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _dump(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        return value if type(value) is int else pickle.loads(value)
+
+    @contextmanager
+    def _write_transaction(self):
+        # IMMEDIATE сразу берёт блокировку записи: между чтением и записью
+        # внутри транзакции другой процесс строку не изменит.
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _wrote(self, count=1):
+        self._writes += count
+        if self._writes >= self.cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        connection = self._connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        (count,) = connection.execute(
+            'SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        excess = count - self._max_entries
+        if self._cull_frequency:
+            excess += count // self._cull_frequency
+        # Первыми удаляются записи, которым раньше всех истекать; версии
+        # тегов без срока — последними.
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache'
+            ' ORDER BY expires IS NULL, expires LIMIT ?)', (excess,))
+
+    def get(self, key, default=None, version=None):
+        row = self._connection.execute(
+            f'SELECT value FROM cache WHERE key = ? AND {self.ALIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else self._load(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        placeholders = ', '.join(['?'] * len(keys))
+        rows = self._connection.execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders})'
+            f' AND {self.ALIVE}',
+            (*keys, time.time()),
+        )
+        return {keys[key]: self._load(value) for key, value in rows}
+
+    def _set_rows(self, data, timeout, version):
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= time.time():
+            self.delete_many(data, version=version)
+            return
+        rows = [
+            (self._key(key, version), self._dump(value), expires)
+            for key, value in data.items()
+        ]
+        with self._write_transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires)'
+                ' VALUES (?, ?, ?)', rows)
+        self._wrote(len(rows))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_rows({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_rows(data, timeout, version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        row = (key, self._dump(value), self.get_backend_timeout(timeout))
+        now = time.time()
+        if self.HAS_UPSERT:
+            cursor = self._connection.execute(
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?)'
+                ' ON CONFLICT (key) DO UPDATE SET'
+                ' value = excluded.value, expires = excluded.expires'
+                ' WHERE cache.expires <= ?',
+                (*row, now),
+            )
+        else:
+            with self._write_transaction() as connection:
+                connection.execute(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    (key, now))
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO cache (key, value, expires)'
+                    ' VALUES (?, ?, ?)', row)
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        update = (
+            'UPDATE cache SET value = value + ? WHERE key = ?'
+            f" AND typeof(value) = 'integer' AND {self.ALIVE}"
+        )
+        params = (delta, self._key(key, version), time.time())
+        if self.HAS_RETURNING:
+            row = self._connection.execute(
+                f'{update} RETURNING value', params).fetchone()
+        else:
+            with self._write_transaction() as connection:
+                row = None
+                if connection.execute(update, params).rowcount == 1:
+                    row = connection.execute(
+                        'SELECT value FROM cache WHERE key = ?',
+                        params[1:2]).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {self.ALIVE}',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {self.ALIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        cursor = self._connection.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        self._connection.executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys],
+        )
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения потоков живут всё время работы процесса.
+        pass
+
+
+class TwoTierCache(BaseCache):
+    """Бэкенд Django: LocalLRU перед SQLiteCache из LOCATION.
+
+    OPTIONS:
+    LOCAL_MAX_ENTRIES — размер локального LRU;
+    LOCAL_TIMEOUT — наибольшее время жизни локальной копии, с;
+    LOCAL_EXCLUDE_PREFIXES — ключи, которые читаются только из общего
+    уровня; MAX_ENTRIES, CULL_FREQUENCY и CULL_EVERY передаются общему.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local = LocalLRU(int(options.get('LOCAL_MAX_ENTRIES', 1000)))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.local_exclude_prefixes = tuple(
+            options.get('LOCAL_EXCLUDE_PREFIXES', ()))
+        self.shared = SQLiteCache(location, {
+            **params,
+            'OPTIONS': {
+                name: value for name, value in options.items()
+                if name in ('MAX_ENTRIES', 'CULL_FREQUENCY', 'CULL_EVERY')
+            },
+        })
+
+    def _local_key(self, key, version):
+        if key.startswith(self.local_exclude_prefixes):
+            return None
+        return self.make_key(key, version)
+
+    def _remember(self, key, value, timeout, version):
+        local_key = self._local_key(key, version)
+        if local_key is None:
+            return
+        expires_at = self.get_backend_timeout(timeout)
+        lifetime = self.local_timeout
+        if expires_at is not None:
+            lifetime = min(lifetime, expires_at - time.time())
+        self.local.set(local_key, value, lifetime)
+
+    def _forget(self, key, version):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self.local.delete(local_key)
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            value = self.local.get(local_key)
+            if value is not _MISSING:
+                return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        if local_key is not None:
+            self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = (
+                _MISSING if local_key is None else self.local.get(local_key))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        for key, value in self.shared.get_many(
+                missing, version=version).items():
+            found[key] = value
+            local_key = self._local_key(key, version)
+            if local_key is not None:
+                self.local.set(local_key, value, self.local_timeout)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            self._remember(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(key, version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None and self.local.get(local_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)  # noqa: W601
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        # Локальные уровни других процессов доживут до LOCAL_TIMEOUT.
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -1 +1,57 @@
 POST_ORDERING = "-pub_date"  # Правило сортировки постов
+# Сортировка для keyset-пагинации: id разрешает совпадения pub_date.
+POST_CURSOR_ORDERING = (POST_ORDERING, "-pk")
+POSTS_PER_PAGE = 10  # Количество постов на странице
+COMMENTS_PER_PAGE = 20  # Количество комментариев в одной порции
+COMMENT_CURSOR_ORDERING = ("created_at", "pk")  # Порядок комментариев
+PAGE_RANGE_ON_EACH_SIDE = 2  # Номеров страниц по сторонам от текущей
+PAGE_RANGE_ON_ENDS = 1  # Номеров страниц в начале и в конце списка
+POST_COUNT_CACHE_TIMEOUT = 60 * 5  # Время жизни количества постов, с
+# С какого количества постов после изменений отдаётся оценка вместо COUNT(*)
+POST_COUNT_ESTIMATE_THRESHOLD = 10_000
+POST_COUNT_ESTIMATE_TIMEOUT = 60 * 15  # Предельный возраст оценки, с
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24  # Предельное время жизни страницы в кэше, с
+# Сколько хранится время ближайшей отложенной публикации: страховка на
+# случай, если сброс этого ключа потерялся
+SCHEDULER_NEXT_CHANGE_TIMEOUT = 60 * 5
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24  # Время жизни карточки поста, с
+CACHE_STALE_GRACE = 60  # Сколько устаревшая запись доступна после срока, с
+CACHE_LOCK_TIMEOUT = 30  # Предельное время блокировки пересчёта записи, с
+CACHE_LOCK_WAIT = 5  # Сколько ждать чужого пересчёта при пустом кэше, с
+CACHE_LOCK_POLL_INTERVAL = 0.05  # Интервал проверки чужого пересчёта, с
+# Бюджет запросов к базе при построении страницы для анонимов, с: при
+# превышении или ошибке базы отдаётся последняя сохранённая копия
+PAGE_DB_TIME_BUDGET = 2
+PAGE_STALE_IF_ERROR = 60 * 60 * 24  # Сколько хранится такая копия, с
+DB_PROGRESS_HANDLER_STEPS = 1000  # Шагов SQLite между проверками бюджета
+# Коэффициент XFetch: больше — раньше начинается досрочный пересчёт
+CACHE_XFETCH_BETA = 1.0
+EXCERPT_WORDS = 10  # Количество слов в анонсе поста
+EXCERPT_MAX_LENGTH = 512  # Предельная длина анонса поста в символах
+TEXT_RENDERER_VERSION = 1  # Увеличить при изменении правил render_text
+SEARCH_MAX_RESULTS = 1000  # Сколько лучших совпадений поиска учитывается
+SEARCH_CACHE_TIMEOUT = 60 * 10  # Время жизни результатов поиска в кэше, с
+SEARCH_ID_CHUNK_SIZE = 500  # id в одном IN: SQLite < 3.32 допускает 999
+SEARCH_SNIPPET_TOKENS = 16  # Длина фрагмента с подсветкой, в словах
+# Ширина уменьшенных копий картинок постов, px
+RENDITION_WIDTHS = {"card": 400, "detail": 960}
+RENDITION_QUALITY = 82  # Качество JPEG уменьшенных копий
+RENDITION_WORKERS = 2  # Процессов в пуле, который строит копии
+UPLOAD_IMAGE_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")  # Допустимые форматы
+# Предел пикселей загружаемой картинки: проверяется по заголовку файла,
+# до декодирования, и защищает от «бомб» вроде PNG 50000×50000.
+UPLOAD_MAX_PIXELS = 40_000_000
+UPLOAD_MAX_SIDE = 2560  # Длинная сторона картинки после перекодирования, px
+UPLOAD_QUALITY = 85  # Качество JPEG при перекодировании загрузок
+UPLOAD_WORKERS = 2  # Процессов, одновременно перекодирующих загрузки
+UPLOAD_TIMEOUT = 30  # Сколько ждать перекодирования загрузки, с
+# Предел адресного пространства процесса, перекодирующего загрузку, байт
+UPLOAD_MEMORY_LIMIT = 1024 * 1024 * 1024
+# Срок кэширования медиафайлов браузером: имена адресуют содержимое
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+# Срок кэширования остальных медиафайлов, после него — запрос с ETag
+MEDIA_REVALIDATE_MAX_AGE = 60 * 60
+WRITE_QUEUE_SIZE = 256  # Сколько записей может ждать писателя
+WRITE_BATCH_SIZE = 32  # Сколько записей фиксируется одной транзакцией
+# Сколько ждать места в переполненной очереди записи перед отказом, с
+WRITE_QUEUE_PUT_TIMEOUT = 2
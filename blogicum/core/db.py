@@ -0,0 +1,67 @@
+"""Настройка соединений с SQLite и ограничение времени запросов.
+
+Каждое новое соединение получает прагмы из настройки SQLITE_PRAGMAS
+(WAL, synchronous, размеры кэша и mmap, busy timeout): прагмы, кроме
+journal_mode, действуют только в пределах соединения, поэтому их нужно
+выставлять заново при каждом подключении.
+
+SQLite умеет вызывать функцию каждые N шагов виртуальной машины
+(progress handler); если она вернёт истину, текущий запрос прерывается
+с OperationalError «interrupted». Так запросы внутри блока
+`query_time_budget` не могут работать дольше заданного бюджета.
+Ожидание блокировки базы в бюджет не входит: его ограничивает
+busy timeout, по истечении которого SQLite сам сообщает
+«database is locked».
+"""
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.cache import incr_metric
+from core.constants import DB_PROGRESS_HANDLER_STEPS
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    """Выполняет `PRAGMA имя = значение` для каждой пары из `pragmas`.
+
+    `cursor` — курсор DB-API: Django или модуля sqlite3.
+    """
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, pragmas)
+
+
+@contextmanager
+def query_time_budget(seconds, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    connection.ensure_connection()
+    raw_connection = connection.connection
+    deadline = time.monotonic() + seconds
+    exceeded = False
+
+    def check_deadline():
+        nonlocal exceeded
+        exceeded = time.monotonic() > deadline
+        return exceeded
+
+    raw_connection.set_progress_handler(
+        check_deadline, DB_PROGRESS_HANDLER_STEPS)
+    try:
+        yield
+    finally:
+        raw_connection.set_progress_handler(None, 0)
+        if exceeded:
+            incr_metric('db_budget_exceeded')
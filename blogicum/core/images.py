@@ -0,0 +1,129 @@
+"""Обработка картинок, которая выполняется в отдельных процессах.
+
+Модуль не зависит от Django, чтобы его можно было импортировать в
+процессах пула, запущенных методом spawn, без настройки проекта.
+"""
+import os
+import resource
+import tempfile
+
+from PIL import Image, ImageOps
+
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'WEBP': {'method': 5},
+}
+
+
+def _save_atomic(image, target, *args, **kwargs):
+    # Запись во временный файл и переименование: шаблоны проверяют
+    # наличие копии и не должны увидеть её недописанной.
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            image.save(temp_file, *args, **kwargs)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def render_renditions(source, targets, quality):
+    """Строит копии `source` по списку (путь, ширина, формат Pillow).
+
+    Исходник декодируется один раз, копии уменьшаются от большей
+    к меньшей, каждая ширина сохраняется во всех нужных форматах.
+    Узкие картинки не увеличиваются.
+    """
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for target, width, image_format in sorted(
+                targets, key=lambda t: -t[1]):
+            if image.width > width:
+                image = image.resize(
+                    (width, max(1, round(image.height * width
+                                         / image.width))),
+                    Image.LANCZOS,
+                )
+            _save_atomic(image, target, image_format, quality=quality,
+                         **SAVE_OPTIONS.get(image_format, {}))
+    return [target for target, _, _ in targets]
+
+
+def read_header(path):
+    """Формат и размеры картинки по заголовку, без декодирования."""
+    with Image.open(path) as image:
+        return image.format, image.size
+
+
+def peak_rss_kib():
+    """Пиковый RSS процесса, КиБ.
+
+    В Linux берётся VmHWM: в отличие от ru_maxrss он не наследуется от
+    родителя при запуске процесса (spawn — это fork и exec).
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reset_peak_rss():
+    """Сбрасывает VmHWM до текущего RSS (Linux 4.0+), см. peak_rss_kib."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def limit_memory(max_bytes):
+    """Ограничивает адресное пространство процесса (initializer пула).
+
+    При превышении выделение памяти завершается MemoryError, а не
+    вытеснением всего сервера OOM killer'ом.
+    """
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        max_bytes = min(max_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+
+
+def reencode_image(source, target, max_side, quality):
+    """Перекодирует загруженную картинку в `target` без метаданных.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    в памяти оказывается растр не больше нужного. EXIF (с геометками)
+    не переносится, ориентация из него применяется к пикселям.
+    Возвращает формат, размеры и пиковый RSS процесса, КиБ: пик
+    сбрасывается в начале, поэтому он относится к этой загрузке, даже
+    если процесс пула выполняет не одно задание.
+    """
+    reset_peak_rss()
+    with Image.open(source) as original:
+        original.draft('RGB', (max_side, max_side))
+        icc_profile = original.info.get('icc_profile')
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'PA') or (
+                'transparency' in image.info):
+            image, image_format = image.convert('RGBA'), 'PNG'
+        else:
+            image, image_format = image.convert('RGB'), 'JPEG'
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image.info = {}
+        with open(target, 'wb') as file:
+            image.save(file, image_format, quality=quality, optimize=True,
+                       icc_profile=icc_profile)
+    return {
+        'format': image_format,
+        'size': image.size,
+        'peak_rss_kib': peak_rss_kib(),
+    }
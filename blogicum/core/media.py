@@ -0,0 +1,172 @@
+"""Раздача файлов из MEDIA_ROOT.
+
+Файлы, имена которых адресуют содержимое (см. core.storage), отдаются
+с долгим Cache-Control и immutable. Остальные — копии картинок, которые
+можно перестроить на месте, и старые файлы с обычными именами —
+кэшируются ненадолго и перепроверяются по валидаторам (ответ 304).
+Недописанные файлы `.part` не отдаются. Если перед Django
+стоит веб-сервер, передачу файла можно отдать ему заголовком
+X-Sendfile (Apache, lighttpd) или X-Accel-Redirect (nginx), настройка
+MEDIA_SENDFILE_HEADER. Иначе файл уходит через FileResponse: WSGI-сервер
+с wsgi.file_wrapper (gunicorn) передаёт его системным вызовом sendfile,
+не копируя байты через Python, в том числе для запросов Range.
+"""
+import mimetypes
+import os
+import re
+import stat
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from core.constants import MEDIA_CACHE_MAX_AGE, MEDIA_REVALIDATE_MAX_AGE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Имя вида каталог/ab/ab…(sha256).расширение; копии картинок в
+# renditions/ наследуют такое имя от оригинала, но не содержимое.
+CONTENT_ADDRESSED_RE = re.compile(
+    r'^(?!renditions/)(?:.+/)?([0-9a-f]{2})/\1[0-9a-f]{62}\.\w+$')
+TEMPORARY_SUFFIX = '.part'
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class FileRange:
+    """Часть открытого файла для FileResponse.
+
+    `fileno()` и `tell()` позволяют wsgi.file_wrapper отправить часть
+    через sendfile со смещения, а `read()` не выходит за её границу,
+    если сервер читает файл сам.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Границы (начало, конец включительно) из заголовка Range.
+
+    Несколько диапазонов и непонятный синтаксис игнорируются — тогда
+    отдаётся весь файл, это допускает RFC 7233.
+    """
+    match = RANGE_RE.match(header or '')
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _range_applies(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _file_response(request, path, full_path, size, etag, last_modified):
+    content_type = mimetypes.guess_type(full_path)[0] or (
+        'application/octet-stream')
+    sendfile_header = settings.MEDIA_SENDFILE_HEADER
+    if sendfile_header:
+        # Range и передачу файла обработает веб-сервер.
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header == 'X-Accel-Redirect':
+            response[sendfile_header] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+        else:
+            response[sendfile_header] = full_path
+        return response
+
+    byte_range = None
+    if _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(
+                status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        return FileResponse(file, content_type=content_type)
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(
+        FileRange(file, start, length),
+        status=HTTPStatus.PARTIAL_CONTENT,
+        content_type=content_type,
+    )
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if (not stat.S_ISREG(file_stat.st_mode)
+            or path.endswith(TEMPORARY_SUFFIX)):
+        raise Http404('Файл не найден')
+
+    etag = quote_etag(f'{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}')
+    last_modified = int(file_stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(
+            request, path, full_path, file_stat.st_size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if response.status_code in (HTTPStatus.OK, HTTPStatus.PARTIAL_CONTENT):
+        if CONTENT_ADDRESSED_RE.match(path):
+            patch_cache_control(response, public=True,
+                                max_age=MEDIA_CACHE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True,
+                                max_age=MEDIA_REVALIDATE_MAX_AGE)
+    return response
@@ -1,28 +1,353 @@
+import logging
+import math
+from http import HTTPStatus
+
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db import DatabaseError
+from django.db.models import Max
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.utils import timezone
-from core.constants import POST_ORDERING
-from blog.models import Comment, Post
+from django.utils.cache import (
+    add_never_cache_headers,
+    get_conditional_response,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from core.cache import (
+    DEGRADED,
+    get_last_tagged,
+    get_or_set_tagged,
+    get_tag_versions,
+    incr_metric,
+    make_key,
+    tag_version_time,
+)
+from core.constants import (
+    COMMENT_CURSOR_ORDERING,
+    COMMENTS_PER_PAGE,
+    PAGE_CACHE_TIMEOUT,
+    PAGE_DB_TIME_BUDGET,
+    PAGE_STALE_IF_ERROR,
+    POST_CURSOR_ORDERING,
+    WRITE_QUEUE_PUT_TIMEOUT,
+)
+from core.db import query_time_budget
+from core.pagination import CachedCountPaginator, CursorPaginator
+from core.writes import WriteQueueFull, submit_write
+from blog.models import Category, Comment, Location, Post
+from blog.scheduler import ensure_published, get_next_change_time
 from blog.forms import (
     PostForm,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class PostQuerySet:
     def get_queryset(self):
         return (
             Post.objects.select_related("author", "location", "category")
+            # В карточках выводится анонс, полный текст в ленте не нужен.
+            .defer("text")
             .filter(
                 is_published=True,
                 category__is_published=True,
-                pub_date__lte=timezone.now(),
+                is_live=True,
             )
-            .order_by(POST_ORDERING)
+            .order_by(*POST_CURSOR_ORDERING)
             .all()
         )
 
 
+class ScheduledPublicationMixin:
+    """Перед обработкой запроса публикует посты, чьё время наступило."""
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            ensure_published()
+        except (DatabaseError, WriteQueueFull):
+            # Пока база занята, посты опубликует следующий запрос или
+            # команда publish_scheduled; чтение от этого не должно падать.
+            logger.warning("Не удалось опубликовать отложенные посты",
+                           exc_info=True)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class CursorPaginationMixin:
+    """Добавляет к ListView курсорный режим `?after=`/`?before=`.
+
+    Старые ссылки вида `?page=N` продолжают работать через обычный
+    пагинатор, но стрелки «вперёд/назад» всегда ведут на курсоры.
+    """
+
+    cursor_ordering = POST_CURSOR_ORDERING
+    paginator_class = CachedCountPaginator
+
+    def get_count_cache_key(self):
+        return None
+
+    def get_paginator(self, *args, **kwargs):
+        return super().get_paginator(
+            *args, count_key=self.get_count_cache_key(), **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        after = self.request.GET.get("after")
+        before = self.request.GET.get("before")
+        if not (after or before):
+            result = super().paginate_queryset(queryset, page_size)
+            page = result[1]
+            page.next_cursor = (
+                paginator.encode(page[-1]) if page.has_next() else None)
+            page.previous_cursor = (
+                paginator.encode(page[0]) if page.has_previous() else None)
+            return result
+        page = paginator.page(after=after, before=before)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+def post_cache_tags(post):
+    """Теги всего, что выводится на странице вместе с постом."""
+    tags = [f"post:{post.pk}", f"author:{post.author_id}"]
+    if post.category_id:
+        tags.append(f"category:{post.category_id}")
+    if post.location_id:
+        tags.append(f"location:{post.location_id}")
+    return tags
+
+
+class AnonymousPageCacheMixin:
+    """Кэширует страницу целиком для анонимных посетителей.
+
+    Ключ строится по пути с query string, а запись сбрасывается сигналами
+    моделей через теги (см. `blog.signals`). По времени запись живёт
+    только до ближайшей отложенной публикации. Устаревшую страницу
+    пересчитывает один запрос, остальные тем временем получают старую.
+    Если база недоступна или отвечает дольше PAGE_DB_TIME_BUDGET,
+    отдаётся последняя сохранённая копия со статусом DEGRADED.
+    """
+
+    page_cache_base_tags = ("post-list",)
+
+    def get_page_cache_base_tags(self):
+        return self.page_cache_base_tags
+
+    def get_page_cache_tags(self, context):
+        tags = set(self.get_page_cache_base_tags())
+        posts = context.get("page_obj") or [context.get("post")]
+        for post in posts:
+            if post is not None:
+                tags.update(post_cache_tags(post))
+        return tags
+
+    def get_page_cache_timeout(self):
+        next_change = get_next_change_time()
+        if next_change is None:
+            return PAGE_CACHE_TIMEOUT
+        seconds = (next_change - timezone.now()).total_seconds()
+        return max(1, min(PAGE_CACHE_TIMEOUT, int(seconds)))
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET" or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        response = None
+
+        def render():
+            nonlocal response
+            response = super(AnonymousPageCacheMixin, self).dispatch(
+                request, *args, **kwargs)
+            if response.status_code != HTTPStatus.OK:
+                return None, (), None
+            response.render()
+            return (
+                (
+                    response.content,
+                    response["Content-Type"],
+                    response.get("ETag"),
+                    response.get("Last-Modified"),
+                ),
+                self.get_page_cache_tags(response.context_data),
+                self.get_page_cache_timeout(),
+            )
+
+        key = make_key("page", request.get_full_path())
+        try:
+            with query_time_budget(PAGE_DB_TIME_BUDGET):
+                cached, status = get_or_set_tagged(
+                    key,
+                    render,
+                    known_tags=self.get_page_cache_base_tags(),
+                    grace=PAGE_STALE_IF_ERROR,
+                )
+        except DatabaseError:
+            # База заблокирована долгой записью или не уложилась в бюджет:
+            # лучше показать страницу со старым содержимым, чем ошибку.
+            cached = get_last_tagged(key)
+            if cached is None:
+                raise
+            logger.warning("Страница %s отдана из кэша: ошибка базы",
+                           request.path, exc_info=True)
+            response = None
+            status = DEGRADED
+        incr_metric(f"page_cache_{status.lower()}")
+        if response is None:
+            response = self.response_from_page_cache(request, *cached)
+        if status == DEGRADED:
+            response["Warning"] = '110 - "Response is Stale"'
+            add_never_cache_headers(response)
+        response["X-Page-Cache"] = status
+        return response
+
+    def response_from_page_cache(self, request, content, content_type,
+                                 etag, last_modified):
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and parse_http_date_safe(
+                last_modified),
+        )
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        if etag:
+            response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = last_modified
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 Not Modified, не выполняя рендеринг шаблона.
+
+    По умолчанию валидаторы считаются для списков постов: Last-Modified —
+    самое позднее из изменений поста, категории или местоположения и
+    сброса тегов из `last_modified_tags`. Сброс тега учитывает и удаления,
+    которых в `updated_at` не видно, а тег `authors` — переименования
+    авторов. ETag дополнительно учитывает пользователя, адрес страницы и
+    CSRF-cookie: после входа в систему старый токен в форме недействителен,
+    и страницу с формой нельзя отдавать из кеша браузера. Публикация
+    отложенного поста обновляет его `updated_at` и сбрасывает тег списка,
+    поэтому валидаторы меняются и в этот момент.
+    """
+
+    last_modified_tags = ("post-list", "authors")
+
+    def get_last_modified_tags(self):
+        return self.last_modified_tags
+
+    def get_last_modified(self):
+        timestamps = [
+            model.objects.aggregate(last=Max("updated_at"))["last"]
+            for model in (Post, Category, Location)
+        ]
+        return max(filter(None, timestamps), default=None)
+
+    def get_etag_parts(self):
+        return tuple(get_tag_versions(self.last_modified_tags).values())
+
+    def get_csrf_cookie(self):
+        # Формы выводятся только вошедшим пользователям, а анонимные
+        # страницы попадают в общий кеш — чужой cookie туда не нужен.
+        if not self.request.user.is_authenticated:
+            return None
+        # `get_token` заводит cookie, если его ещё нет, — иначе ETag
+        # первого ответа разошёлся бы со следующими.
+        get_token(self.request)
+        return self.request.META["CSRF_COOKIE"]
+
+    def get_validators(self):
+        last_modified = self.get_last_modified()
+        invalidated = max(
+            map(tag_version_time,
+                get_tag_versions(self.get_last_modified_tags()).values()),
+            default=0,
+        )
+        etag = quote_etag(make_key(
+            "etag",
+            self.request.user.pk,
+            self.get_csrf_cookie(),
+            self.request.get_full_path(),
+            last_modified,
+            *self.get_etag_parts(),
+        ))
+        # Секунды округляются вверх: сброс в ту же секунду, что и
+        # прошлый ответ, всё равно сдвигает Last-Modified.
+        timestamp = max(
+            int(last_modified.timestamp()) if last_modified else 0,
+            math.ceil(invalidated),
+        )
+        return etag, timestamp or None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+
+class PostCommentsMixin:
+    """Проверка доступа к посту и порционная выдача его комментариев."""
+
+    def check_post_visibility(self, post):
+        if post.author_id != self.request.user.pk and not post.is_published:
+            raise Http404("Страница не найдена")
+        return post
+
+    def get_comments_page(self, post, after=None):
+        comments = post.comments.select_related("author")
+        return CursorPaginator(
+            comments, COMMENTS_PER_PAGE, COMMENT_CURSOR_ORDERING
+        ).page(after=after)
+
+
+def write_queue_full_response():
+    response = HttpResponse(
+        "Сервер перегружен, повторите попытку позже.",
+        status=HTTPStatus.SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = WRITE_QUEUE_PUT_TIMEOUT
+    return response
+
+
+class QueuedSaveMixin:
+    """Сохраняет форму через очередь записи (см. `core.writes`)."""
+
+    def form_valid(self, form):
+        # Файлы пишутся в хранилище до очереди: писатель держит
+        # блокировку записи SQLite, и ждать ввода-вывода ей незачем.
+        commit_files = getattr(form.instance, "commit_files", None)
+        if commit_files is not None:
+            commit_files()
+        try:
+            self.object = submit_write(form.save)
+        except WriteQueueFull:
+            return write_queue_full_response()
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class QueuedDeleteMixin:
+    """Удаляет объект через очередь записи (см. `core.writes`)."""
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        try:
+            submit_write(self.object.delete)
+        except WriteQueueFull:
+            return write_queue_full_response()
+        return HttpResponseRedirect(success_url)
+
+
 class PostMixin:
     model = Post
     form_class = PostForm
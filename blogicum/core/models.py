@@ -1,4 +1,12 @@
 from django.db import models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.safestring import mark_safe
+
+from core.constants import TEXT_RENDERER_VERSION
+
+
+def render_text(text):
+    return linebreaksbr(text, autoescape=True)
 
 
 class PublishedCreatedAtModel(models.Model):
@@ -9,6 +17,42 @@ class PublishedCreatedAtModel(models.Model):
     )
     created_at = models.DateTimeField('Добавлено',
                                       auto_now_add=True)
+    updated_at = models.DateTimeField('Изменено', auto_now=True)
 
     class Meta:
         abstract = True
+
+
+class RenderedTextModel(models.Model):
+    """Хранит HTML поля `text`, подготовленный при записи.
+
+    Если правила render_text поменялись, повышается
+    TEXT_RENDERER_VERSION, а старые записи обновляет команда
+    rerender_texts; до этого они отрисовываются на лету.
+    """
+
+    text_html = models.TextField(
+        'HTML текста', blank=True, default='', editable=False)
+    text_html_version = models.PositiveSmallIntegerField(
+        'Версия отрисовки текста', default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def render_text_html(self):
+        self.text_html = render_text(self.text)
+        self.text_html_version = TEXT_RENDERER_VERSION
+
+    @property
+    def rendered_text(self):
+        if self.text_html_version != TEXT_RENDERER_VERSION:
+            return render_text(self.text)
+        return mark_safe(self.text_html)
+
+    def save(self, *args, **kwargs):
+        self.render_text_html()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'text_html', 'text_html_version'}
+        super().save(*args, **kwargs)
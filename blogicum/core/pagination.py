@@ -0,0 +1,277 @@
+import base64
+import binascii
+import bisect
+import json
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from core.cache import repeat_on_commit
+from core.constants import (
+    PAGE_RANGE_ON_EACH_SIDE,
+    PAGE_RANGE_ON_ENDS,
+    POST_COUNT_CACHE_TIMEOUT,
+    POST_COUNT_ESTIMATE_THRESHOLD,
+    POST_COUNT_ESTIMATE_TIMEOUT,
+)
+
+COUNT_GENERATION_KEY = 'paginator-count:generation'
+
+
+def _bump_count_generation():
+    try:
+        cache.incr(COUNT_GENERATION_KEY)
+    except ValueError:
+        cache.add(COUNT_GENERATION_KEY, 1, timeout=None)
+
+
+def bump_count_generation():
+    """Помечает все закэшированные количества постов устаревшими."""
+    repeat_on_commit(_bump_count_generation)
+
+
+class ElidedPage(Page):
+
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(
+            self.number,
+            on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+            on_ends=PAGE_RANGE_ON_ENDS,
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, который не выполняет COUNT(*) на каждый запрос.
+
+    Количество хранится в кэше под ключом `count_key` и сбрасывается при
+    изменении постов. Для больших лент после изменений какое-то время
+    отдаётся прежнее значение как оценка — на навигацию это почти
+    не влияет, а тяжёлый COUNT выполняется не чаще раза в
+    POST_COUNT_ESTIMATE_TIMEOUT.
+    """
+
+    def __init__(self, *args, count_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    def _get_page(self, *args, **kwargs):
+        return ElidedPage(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        key = f'paginator-count:{self.count_key}'
+        generation = cache.get(COUNT_GENERATION_KEY, 0)
+        cached = cache.get(key)
+        now = time.time()
+        if cached is not None:
+            cached_generation, count, counted_at = cached
+            if cached_generation == generation:
+                return count
+            if (count >= POST_COUNT_ESTIMATE_THRESHOLD
+                    and now - counted_at < POST_COUNT_ESTIMATE_TIMEOUT):
+                return count
+        count = super().count
+        cache.set(key, (generation, count, now), POST_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс `django.core.paginator.Page`, которым пользуются
+    шаблоны, но не знает своего номера и общего числа страниц.
+    """
+
+    number = None
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по набору полей сортировки.
+
+    Вместо OFFSET страница выбирается условием «строго после/до
+    граничной записи», поэтому стоимость запроса не зависит от того,
+    насколько далеко от начала ленты находится страница.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    def _fields(self):
+        opts = self.queryset.model._meta
+        for item in self.ordering:
+            name = item.lstrip('-')
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            yield name, field, item.startswith('-')
+
+    @staticmethod
+    def _pack(values):
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def _unpack(token, length):
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != length:
+            raise ValueError
+        return values
+
+    def encode(self, obj):
+        return self._pack([
+            field.value_to_string(obj) for _, field, _ in self._fields()
+        ])
+
+    def decode(self, token):
+        try:
+            fields = list(self._fields())
+            values = self._unpack(token, len(fields))
+            return [
+                field.to_python(value)
+                for (_, field, _), value in zip(fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise Http404('Некорректный курсор страницы')
+
+    def _keyset_filter(self, values, forward):
+        fields = list(self._fields())
+        condition = Q()
+        equal = {}
+        for (name, _, descending), value in zip(fields, values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        # Нестрогая граница по первому полю дублирует условие выше, но
+        # позволяет SQLite начать обход индекса сразу с курсора.
+        name, _, descending = fields[0]
+        lookup = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def _reversed_ordering(self):
+        return tuple(
+            item[1:] if item.startswith('-') else f'-{item}'
+            for item in self.ordering
+        )
+
+    def page(self, after=None, before=None):
+        queryset = self.queryset
+        if before:
+            queryset = queryset.filter(
+                self._keyset_filter(self.decode(before), forward=False)
+            ).order_by(*self._reversed_ordering())
+        else:
+            if after:
+                queryset = queryset.filter(
+                    self._keyset_filter(self.decode(after), forward=True)
+                )
+            queryset = queryset.order_by(*self.ordering)
+
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if before:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self.encode(items[-1]) if has_next and items else None,
+            previous_cursor=(
+                self.encode(items[0]) if has_previous and items else None
+            ),
+        )
+
+
+class RankedCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по готовому упорядоченному списку.
+
+    `ranked` — пары (вес, pk) в порядке выдачи, например результат
+    поиска. Курсор хранит пару граничной записи, поэтому страницы не
+    съезжают, если список пересчитали между запросами. Объекты страницы
+    выбираются из `queryset` одним запросом по pk.
+    """
+
+    def __init__(self, ranked, queryset, per_page):
+        super().__init__(queryset, per_page, ordering=())
+        self.ranked = list(ranked)
+
+    @property
+    def count(self):
+        return len(self.ranked)
+
+    def encode(self, key):
+        return self._pack(list(key))
+
+    def decode(self, token):
+        try:
+            weight, pk = self._unpack(token, 2)
+            return float(weight), int(pk)
+        except (binascii.Error, ValueError, TypeError):
+            raise Http404('Некорректный курсор страницы')
+
+    def page(self, after=None, before=None):
+        if before:
+            end = bisect.bisect_left(self.ranked, self.decode(before))
+            start = max(0, end - self.per_page)
+        else:
+            start = (
+                bisect.bisect_right(self.ranked, self.decode(after))
+                if after else 0
+            )
+            end = start + self.per_page
+        keys = self.ranked[start:end]
+        # Пост мог стать невидимым после того, как список был составлен:
+        # такие просто пропускаются, курсоры строятся по самому списку.
+        objects = self.queryset.in_bulk([pk for _, pk in keys])
+        items = [objects[pk] for _, pk in keys if pk in objects]
+        return CursorPage(
+            items,
+            self,
+            next_cursor=(
+                self.encode(keys[-1])
+                if keys and end < len(self.ranked) else None
+            ),
+            previous_cursor=(
+                self.encode(keys[0]) if keys and start > 0 else None
+            ),
+        )
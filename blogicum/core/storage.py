@@ -0,0 +1,47 @@
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Файл `post_images/photo.jpg` сохраняется как
+    `post_images/ab/ab12…ef.jpg`, поэтому одинаковые загрузки делят один
+    файл, а содержимое по URL никогда не меняется. Ссылки на файл считает
+    база (см. `blog.blobs`): удалять файл при удалении поста нельзя,
+    он может быть нужен другим постам.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Совпадение имён означает совпадение содержимого.
+        return name
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Обновлённое время изменения защищает файл от сборщика
+            # мусора, пока ссылающийся на него пост ещё не сохранён.
+            os.utime(self.path(name))
+            return name
+        # Запись во временный файл и атомарное переименование: две
+        # одновременные загрузки одного содержимого не мешают друг другу.
+        temp_name = super()._save(
+            posixpath.join(posixpath.dirname(name),
+                           f'.{uuid.uuid4().hex}.part'),
+            content,
+        )
+        os.replace(self.path(temp_name), self.path(name))
+        return name
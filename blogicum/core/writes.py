@@ -0,0 +1,114 @@
+"""Очередь записи в SQLite с одним писателем.
+
+SQLite допускает одну пишущую транзакцию за раз: когда много потоков
+пишут одновременно, они по очереди ждут блокировку и при всплеске
+получают «database is locked». Здесь все записи процесса выполняет один
+поток: он забирает из очереди до WRITE_BATCH_SIZE заданий и выполняет их
+в одной транзакции, каждое в своей точке сохранения, чтобы ошибка одного
+задания не отменяла остальные. Всплеск комментариев фиксируется
+несколькими транзакциями вместо сотни.
+
+Очередь ограничена: если она заполнена дольше WRITE_QUEUE_PUT_TIMEOUT,
+`submit_write` поднимает WriteQueueFull, и вызывающий код может ответить
+503 вместо того, чтобы копить ожидающие запросы.
+
+Внутри уже открытой транзакции (ATOMIC_REQUESTS, тесты, команды) задание
+выполняется сразу в вызывающем потоке: иначе писатель не увидел бы её
+незафиксированных данных.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.cache import incr_metric
+from core.constants import (
+    WRITE_BATCH_SIZE,
+    WRITE_QUEUE_PUT_TIMEOUT,
+    WRITE_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueueFull(Exception):
+    """Очередь записи переполнена."""
+
+
+class WriteQueue:
+    def __init__(self, max_size=WRITE_QUEUE_SIZE,
+                 batch_size=WRITE_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size
+        self.using = using
+        self._jobs = queue.Queue(max_size)
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._run, name='write-queue', daemon=True)
+                self._writer.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Выполняет `func(*args, **kwargs)` писателем и ждёт результата."""
+        if connections[self.using].in_atomic_block:
+            return func(*args, **kwargs)
+        future = Future()
+        self._ensure_writer()
+        try:
+            self._jobs.put(
+                (future, func, args, kwargs), timeout=WRITE_QUEUE_PUT_TIMEOUT)
+        except queue.Full:
+            incr_metric('write_queue_full')
+            raise WriteQueueFull from None
+        return future.result()
+
+    def _take_batch(self):
+        batch = [self._jobs.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            self._commit(batch)
+            # Поток не проходит через request_finished, поэтому старое или
+            # сломанное соединение закрывается здесь.
+            connections[self.using].close_if_unusable_or_obsolete()
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            results.append((future, func(*args, **kwargs)))
+                    except Exception as error:
+                        future.set_exception(error)
+        except Exception as error:
+            logger.warning('Не удалось зафиксировать пакет записи',
+                           exc_info=True)
+            for future, _ in results:
+                future.set_exception(error)
+            return
+        incr_metric('write_batches')
+        for future, result in results:
+            future.set_result(result)
+
+
+write_queue = WriteQueue()
+
+
+def submit_write(func, *args, **kwargs):
+    return write_queue.submit(func, *args, **kwargs)
@@ -363,7 +363,42 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
+                    or filename.endswith(".avif")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
                     os.remove(file_path)
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    # Для тестов, которые строят копии картинок или удаляют файлы без
+    # ссылок из базы: настоящий MEDIA_ROOT им давать нельзя.
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_location(tmp_path_factory):
+    # Кэш очищается перед каждым тестом — хранилище в BASE_DIR/cache,
+    # которым пользуется запущенный сайт, трогать нельзя.
+    from django.conf import settings
+
+    caches = {
+        alias: {**params, "LOCATION": str(tmp_path_factory.mktemp(alias))}
+        for alias, params in settings.CACHES.items()
+    }
+    with override_settings(CACHES=caches):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Откат транзакции в тестах не посылает сигналов об изменениях,
+    # поэтому закэшированные данные не должны переживать тест.
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
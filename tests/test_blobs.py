@@ -0,0 +1,62 @@
+from io import BytesIO
+
+import pytest
+from blog.renditions import rendition_name
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("media_root")]
+
+
+def _photo(color):
+    data = BytesIO()
+    Image.new("RGB", (20, 20), color).save(data, "JPEG")
+    return SimpleUploadedFile("photo.jpg", data.getvalue())
+
+
+@pytest.fixture
+def posts_with_same_photo(mixer: Mixer, user, published_category):
+    posts = mixer.cycle(2).blend(
+        "blog.Post", author=user, category=published_category)
+    for post in posts:
+        post.image = _photo("blue")
+        post.save()
+    yield posts
+    for post in posts:
+        post.image.storage.delete(post.image.name)
+
+
+def test_identical_uploads_share_a_file(posts_with_same_photo):
+    first, second = posts_with_same_photo
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые картинки хранятся в одном файле."
+    )
+    assert first.image.name.startswith("post_images/")
+    assert len(first.image.name.split("/")[-1]) == len("0" * 64 + ".jpg")
+
+
+def test_sweep_keeps_referenced_files(posts_with_same_photo):
+    first, second = posts_with_same_photo
+    storage = first.image.storage
+    name = first.image.name
+    call_command("build_renditions")
+    card = rendition_name(name, "card")
+    assert storage.exists(card)
+
+    first.delete()
+    call_command("sweep_media", grace=0)
+    assert storage.exists(name), (
+        "Убедитесь, что файл, на который ещё ссылается пост, не удаляется."
+    )
+
+    second.image = _photo("green")
+    second.save()
+    call_command("sweep_media", grace=0, dry_run=True)
+    assert storage.exists(name)
+    call_command("sweep_media", grace=0)
+    assert not storage.exists(name) and not storage.exists(card)
+    assert storage.exists(second.image.name)
+
+    call_command("sweep_media", grace=3600)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from core import cache as tagged_cache
+from core.cache import (
+    HIT,
+    LOCK_PREFIX,
+    REFRESH,
+    STALE,
+    UPDATING,
+    get_or_set_tagged,
+    invalidate_tags,
+    set_tagged,
+)
+from django.core.cache import cache
+
+
+def _compute(value, calls, delay=0):
+    def compute():
+        calls.append(value)
+        time.sleep(delay)
+        return value, ("post-list",), 60
+    return compute
+
+
+def test_concurrent_misses_compute_once():
+    calls, results = [], []
+
+    def worker():
+        results.append(get_or_set_tagged(
+            "feed", _compute("fresh", calls, delay=0.3)))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1, (
+        "Убедитесь, что одновременные промахи по одному ключу вычисляют"
+        " значение один раз."
+    )
+    assert [value for value, _ in results] == ["fresh"] * 5
+
+
+def test_stale_value_is_served_while_updating():
+    set_tagged("feed", "old", ("post-list",), timeout=60)
+    invalidate_tags("post-list")
+    cache.add(f"{LOCK_PREFIX}feed", True)
+    calls = []
+
+    assert get_or_set_tagged("feed", _compute("new", calls)) == (
+        "old", UPDATING)
+    assert not calls
+
+    cache.delete(f"{LOCK_PREFIX}feed")
+    assert get_or_set_tagged("feed", _compute("new", calls)) == (
+        "new", STALE)
+    assert get_or_set_tagged("feed", _compute("newer", calls)) == (
+        "new", HIT)
+
+
+def test_entry_is_refreshed_early_near_expiry(monkeypatch):
+    monkeypatch.setattr(tagged_cache.random, "random", lambda: 0.5)
+    calls = []
+    set_tagged("feed", "old", ("post-list",), timeout=60, delta=0)
+    assert get_or_set_tagged("feed", _compute("new", calls)) == ("old", HIT)
+
+    set_tagged("feed", "old", ("post-list",), timeout=60, delta=1000)
+    assert get_or_set_tagged("feed", _compute("new", calls)) == (
+        "new", REFRESH), (
+        "Убедитесь, что запись, вычисление которой долгое, пересчитывается"
+        " заранее при приближении срока."
+    )
+    assert calls == ["new"]
+
+
+def test_expired_entry_is_kept_for_stale_serving(monkeypatch):
+    set_tagged("feed", "old", ("post-list",), timeout=60)
+    expired = time.time() + 61
+    monkeypatch.setattr(tagged_cache.time, "time", lambda: expired)
+    cache.add(f"{LOCK_PREFIX}feed", True)
+    assert get_or_set_tagged("feed", _compute("new", [])) == (
+        "old", UPDATING)
@@ -0,0 +1,54 @@
+import pytest
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _count(post):
+    post.refresh_from_db(fields=["comment_count"])
+    return post.comment_count
+
+
+def test_comment_count_follows_comments(
+        mixer: Mixer, user, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend(
+        "blog.Comment", post=post, author=user, is_published=True)
+    assert _count(post) == 3, (
+        "Убедитесь, что счётчик комментариев растёт при их создании."
+    )
+
+    comments[0].is_published = False
+    comments[0].save()
+    assert _count(post) == 2, (
+        "Убедитесь, что снятые с публикации комментарии не учитываются."
+    )
+
+    comments[1].delete()
+    assert _count(post) == 1, (
+        "Убедитесь, что счётчик комментариев уменьшается при удалении."
+    )
+
+
+def test_rebuild_comment_counts(
+        mixer: Mixer, user, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend(
+        "blog.Comment", post=post, author=user, is_published=True)
+    type(post).objects.filter(pk=post.pk).update(comment_count=42)
+
+    call_command("rebuild_comment_counts", chunk_size=1)
+    assert _count(post) == 2
+
+
+def test_counter_does_not_filter_comment_list(
+        client, mixer: Mixer, user, post_with_published_location):
+    post = post_with_published_location
+    hidden = mixer.blend("blog.Comment", post=post, author=user,
+                         is_published=False)
+    response = client.get(f"/posts/{post.id}/")
+    assert hidden in list(response.context["comments"]), (
+        "Убедитесь, что счётчик не меняет набор комментариев на странице"
+        " поста: он учитывает только опубликованные, список — все."
+    )
@@ -0,0 +1,107 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _revalidate(client, url, response):
+    return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+
+def test_detail_answers_not_modified(
+        user_client, mixer: Mixer, user, post_with_published_location):
+    url = f"/posts/{post_with_published_location.id}/"
+    response = user_client.get(url)
+    assert response.has_header("ETag") and response.has_header(
+        "Last-Modified")
+
+    not_modified = _revalidate(user_client, url, response)
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED, (
+        "Убедитесь, что страница поста отвечает 304 на запрос с актуальным"
+        " If-None-Match."
+    )
+    assert not not_modified.templates
+
+    mixer.blend("blog.Comment", post=post_with_published_location,
+                author=user, is_published=True)
+    assert _revalidate(user_client, url, response).status_code == (
+        HTTPStatus.OK)
+
+
+def test_feed_validators_follow_posts(
+        user_client, mixer: Mixer, user, published_category,
+        post_with_published_location):
+    response = user_client.get("/")
+    assert _revalidate(user_client, "/", response).status_code == (
+        HTTPStatus.NOT_MODIFIED)
+
+    post_with_published_location.delete()
+    assert _revalidate(user_client, "/", response).status_code == (
+        HTTPStatus.OK), (
+        "Убедитесь, что ETag ленты меняется при удалении поста."
+    )
+
+
+def test_etag_depends_on_user(
+        user_client, another_user_client, post_with_published_location):
+    url = f"/posts/{post_with_published_location.id}/"
+    response = user_client.get(url)
+    assert _revalidate(another_user_client, url, response).status_code == (
+        HTTPStatus.OK)
+
+
+def test_cached_anonymous_page_answers_not_modified(
+        client, django_assert_num_queries, post_with_published_location):
+    response = client.get("/")
+    with django_assert_num_queries(0):
+        not_modified = _revalidate(client, "/", response)
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_feed_last_modified_moves_on_delete(
+        client, mixer: Mixer, user, published_category, monkeypatch):
+    posts = mixer.cycle(2).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True)
+    response = client.get("/")
+    # Удаление — в следующей секунде, иначе Last-Modified не различит.
+    later = time.time_ns() + 2 * 10**9
+    monkeypatch.setattr(time, "time_ns", lambda: later)
+    max(posts, key=lambda post: post.updated_at).delete()
+
+    revalidated = client.get(
+        "/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+    assert revalidated.status_code == HTTPStatus.OK, (
+        "Убедитесь, что Last-Modified ленты сдвигается при удалении поста"
+        " и запрос только с If-Modified-Since не получает 304."
+    )
+    assert revalidated["Last-Modified"] != response["Last-Modified"]
+
+
+def test_feed_etag_changes_on_author_rename(
+        user_client, user, post_with_published_location):
+    response = user_client.get("/")
+    user.username = f"{user.username}-renamed"
+    user.save()
+    assert _revalidate(user_client, "/", response).status_code == (
+        HTTPStatus.OK), (
+        "Убедитесь, что ETag ленты меняется при переименовании автора."
+    )
+
+
+def test_detail_etag_changes_with_csrf_cookie(
+        user_client, post_with_published_location):
+    url = f"/posts/{post_with_published_location.id}/"
+    response = user_client.get(url)
+    assert _revalidate(user_client, url, response).status_code == (
+        HTTPStatus.NOT_MODIFIED)
+
+    # Повторный вход выдаёт новый CSRF-cookie: токен в форме комментария
+    # из закешированной страницы стал бы недействительным.
+    user_client.cookies[settings.CSRF_COOKIE_NAME] = "a" * 32
+    assert _revalidate(user_client, url, response).status_code == (
+        HTTPStatus.OK)
@@ -0,0 +1,43 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+LONG_TEXT = " ".join(f"слово{i}" for i in range(30))
+
+
+def test_excerpt_is_saved_with_post(post_with_published_location):
+    post = post_with_published_location
+    post.text = LONG_TEXT
+    post.save()
+    post.refresh_from_db(fields=["excerpt"])
+    assert post.excerpt == " ".join(LONG_TEXT.split()[:10]) + " …", (
+        "Убедитесь, что анонс поста формируется при сохранении."
+    )
+
+
+def test_feed_uses_excerpt_without_text(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    post.text = LONG_TEXT
+    post.save()
+    with CaptureQueriesContext(connection) as ctx:
+        content = user_client.get("/").content.decode()
+    feed_sql = [q["sql"] for q in ctx.captured_queries
+                if 'FROM "blog_post"' in q["sql"] and "LIMIT" in q["sql"]]
+    assert feed_sql and all('"blog_post"."text"' not in sql
+                            for sql in feed_sql), (
+        "Убедитесь, что лента не загружает полный текст постов."
+    )
+    assert post.excerpt in content
+    assert "слово20" not in content
+
+
+def test_backfill_excerpts(post_with_published_location):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(excerpt="")
+    call_command("backfill_excerpts", chunk_size=1)
+    post.refresh_from_db(fields=["excerpt"])
+    assert post.excerpt == type(post).make_excerpt(post.text)
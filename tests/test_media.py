@@ -0,0 +1,116 @@
+import hashlib
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = [pytest.mark.usefixtures("media_root")]
+
+CONTENT = bytes(range(256)) * 4
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+NAME = f"post_images/{DIGEST[:2]}/{DIGEST}.jpg"
+
+
+@pytest.fixture
+def media_file(media_root):
+    (media_root / NAME).parent.mkdir(parents=True)
+    (media_root / NAME).write_bytes(CONTENT)
+    return f"/media/{NAME}"
+
+
+@pytest.fixture
+def legacy_media_file(media_root):
+    (media_root / "post_images").mkdir(exist_ok=True)
+    (media_root / "post_images" / "photo.jpg").write_bytes(CONTENT)
+    return "/media/post_images/photo.jpg"
+
+
+def _body(response):
+    return b"".join(response.streaming_content)
+
+
+def test_file_is_served_with_validators(client, media_file):
+    response = client.get(media_file)
+    assert response.status_code == HTTPStatus.OK
+    assert _body(response) == CONTENT
+    assert response["Content-Type"] == "image/jpeg"
+    assert response["Content-Length"] == str(len(CONTENT))
+    assert "immutable" in response["Cache-Control"]
+
+    not_modified = client.get(
+        media_file, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED, (
+        "Убедитесь, что медиафайл отдаётся с ответом 304 по ETag."
+    )
+
+
+@pytest.mark.parametrize(
+    ("header", "start", "end"),
+    [("bytes=10-19", 10, 19), ("bytes=1000-", 1000, 1023),
+     ("bytes=-24", 1000, 1023), ("bytes=1000-5000", 1000, 1023)],
+)
+def test_range_request(client, media_file, header, start, end):
+    response = client.get(media_file, HTTP_RANGE=header)
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert _body(response) == CONTENT[start:end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/1024"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+def test_range_edge_cases(client, media_file):
+    unsatisfiable = client.get(media_file, HTTP_RANGE="bytes=2000-")
+    assert unsatisfiable.status_code == (
+        HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+    assert unsatisfiable["Content-Range"] == "bytes */1024"
+
+    for header in ("bytes=0-1,5-6", "lines=1-2"):
+        assert client.get(
+            media_file, HTTP_RANGE=header).status_code == HTTPStatus.OK
+
+    stale = client.get(media_file, HTTP_RANGE="bytes=0-1",
+                       HTTP_IF_RANGE='"outdated"')
+    assert stale.status_code == HTTPStatus.OK
+
+
+def test_sendfile_headers(client, settings, media_file):
+    settings.MEDIA_SENDFILE_HEADER = "X-Accel-Redirect"
+    response = client.get(media_file)
+    assert response["X-Accel-Redirect"] == f"/protected-media/{NAME}"
+    assert response.content == b""
+
+    settings.MEDIA_SENDFILE_HEADER = "X-Sendfile"
+    response = client.get(media_file)
+    assert response["X-Sendfile"].endswith(NAME)
+
+
+def test_missing_and_outside_files(client, media_file):
+    for url in ("/media/post_images/absent.jpg", "/media/post_images/",
+                "/media/../manage.py"):
+        assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_only_content_addressed_files_are_immutable(
+        client, media_root, media_file, legacy_media_file):
+    renditions = media_root / "renditions" / "400w" / NAME
+    renditions.parent.mkdir(parents=True)
+    renditions.write_bytes(CONTENT)
+    for url in (legacy_media_file, f"/media/renditions/400w/{NAME}"):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert "immutable" not in response["Cache-Control"], (
+            "Убедитесь, что immutable получают только файлы, имена которых"
+            " адресуют содержимое."
+        )
+        assert "max-age=3600" in response["Cache-Control"]
+
+    unsatisfiable = client.get(media_file, HTTP_RANGE="bytes=2000-")
+    assert not unsatisfiable.has_header("Cache-Control"), (
+        "Убедитесь, что ответ 416 не кэшируется."
+    )
+
+
+def test_partial_uploads_are_not_served(client, media_root):
+    (media_root / "post_images").mkdir()
+    (media_root / "post_images" / "photo.jpg.1234.part").write_bytes(
+        CONTENT)
+    response = client.get("/media/post_images/photo.jpg.1234.part")
+    assert response.status_code == HTTPStatus.NOT_FOUND
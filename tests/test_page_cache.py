@@ -0,0 +1,83 @@
+import pytest
+from core.cache import get_metrics
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_anonymous_feed_is_cached(
+        client, django_assert_num_queries, post_with_published_location):
+    assert client.get("/")["X-Page-Cache"] == "MISS"
+    with django_assert_num_queries(0):
+        response = client.get("/")
+    assert response["X-Page-Cache"] == "HIT", (
+        "Убедитесь, что повторный запрос главной страницы анонимным"
+        " пользователем отдаётся из кэша."
+    )
+    assert post_with_published_location.title in response.content.decode()
+    assert get_metrics("page_cache_hit")["page_cache_hit"] == 1
+
+
+def test_query_string_is_part_of_key(client, post_with_published_location):
+    client.get("/")
+    assert client.get("/?page=1")["X-Page-Cache"] == "MISS"
+
+
+def test_post_change_invalidates_pages(
+        client, post_with_published_location):
+    post = post_with_published_location
+    detail_url = f"/posts/{post.id}/"
+    client.get("/")
+    client.get(detail_url)
+
+    post.title = "Заголовок после правки"
+    post.save()
+
+    for url in ("/", detail_url):
+        response = client.get(url)
+        assert response["X-Page-Cache"] == "STALE"
+        assert post.title in response.content.decode(), (
+            "Убедитесь, что изменение поста сбрасывает кэш страниц."
+        )
+
+
+def test_related_changes_invalidate_detail(
+        client, mixer: Mixer, user, post_with_published_location):
+    post = post_with_published_location
+    detail_url = f"/posts/{post.id}/"
+
+    client.get(detail_url)
+    mixer.blend("blog.Comment", post=post, author=user, is_published=True,
+                text="Свежий комментарий")
+    assert "Свежий комментарий" in client.get(detail_url).content.decode()
+
+    post.location.name = "Новое место"
+    post.location.save()
+    assert "Новое место" in client.get(detail_url).content.decode()
+
+
+def test_logged_in_user_bypasses_cache(
+        user_client, post_with_published_location):
+    user_client.get("/")
+    response = user_client.get("/")
+    assert "X-Page-Cache" not in response
+    assert response.context is not None
+
+
+def _card_renders(response):
+    return sum(
+        t.name == "includes/post_card.html" for t in response.templates)
+
+
+def test_post_cards_are_cached(user_client, post_with_published_location):
+    post = post_with_published_location
+    assert _card_renders(user_client.get("/")) == 1
+    assert _card_renders(user_client.get("/")) == 0, (
+        "Убедитесь, что карточки постов берутся из кэша фрагментов."
+    )
+
+    post.category.title = "Переименованная категория"
+    post.category.save()
+    response = user_client.get("/")
+    assert _card_renders(response) == 1
+    assert post.category.title in response.content.decode()
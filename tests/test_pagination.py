@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+import pytest
+from conftest import N_PER_PAGE
+from core.pagination import CachedCountPaginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def feed_posts(mixer: Mixer, user, published_category):
+    # Часть постов с одинаковым временем публикации: курсор должен
+    # различать их по id.
+    now = timezone.now()
+    pub_dates = (
+        now - timedelta(hours=i // 3) for i in range(N_PER_PAGE * 2 + 5)
+    )
+    return mixer.cycle(N_PER_PAGE * 2 + 5).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=pub_dates,
+    )
+
+
+def _ids(response):
+    return [post.id for post in response.context["page_obj"]]
+
+
+def test_cursor_walk_matches_page_numbers(user_client, feed_posts):
+    by_numbers = []
+    for number in (1, 2, 3):
+        by_numbers.extend(_ids(user_client.get(f"/?page={number}")))
+
+    by_cursor = []
+    response = user_client.get("/")
+    while True:
+        by_cursor.extend(_ids(response))
+        page = response.context["page_obj"]
+        if not page.has_next():
+            break
+        response = user_client.get(f"/?after={page.next_cursor}")
+
+    assert by_cursor == by_numbers, (
+        "Убедитесь, что обход ленты по курсорам `?after=` возвращает те же"
+        " публикации в том же порядке, что и нумерованные страницы."
+    )
+    assert len(set(by_cursor)) == len(feed_posts)
+
+
+def test_cursor_before_returns_previous_page(user_client, feed_posts):
+    first = user_client.get("/")
+    second = user_client.get(
+        f"/?after={first.context['page_obj'].next_cursor}")
+    back = user_client.get(
+        f"/?before={second.context['page_obj'].previous_cursor}")
+    assert _ids(back) == _ids(first)
+    assert not back.context["page_obj"].has_previous()
+
+
+def test_invalid_cursor_returns_404(user_client, feed_posts):
+    assert user_client.get("/?after=not-a-cursor").status_code == 404
+
+
+def test_cursor_in_category_and_profile(user_client, user, feed_posts,
+                                        published_category):
+    for url in (
+        f"/category/{published_category.slug}/",
+        f"/profile/{user.username}/",
+    ):
+        first = user_client.get(url)
+        cursor = first.context["page_obj"].next_cursor
+        second = user_client.get(f"{url}?after={cursor}")
+        assert second.status_code == 200
+        assert _ids(second) == _ids(user_client.get(f"{url}?page=2"))
+
+
+def test_elided_page_range_is_bounded():
+    paginator = CachedCountPaginator(list(range(50_000)), 1)
+    page_range = list(paginator.page(25_000).elided_page_range)
+    assert len(page_range) < 15, (
+        "Убедитесь, что пагинатор выводит сокращённый список страниц."
+    )
+    assert 25_000 in page_range and paginator.ELLIPSIS in page_range
+
+
+def _count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(url)
+    return sum("COUNT(*)" in q["sql"] for q in ctx.captured_queries)
+
+
+def test_feed_count_is_cached_until_posts_change(
+        user_client, feed_posts, mixer: Mixer, user, published_category):
+    assert _count_queries(user_client, "/") == 1
+    assert _count_queries(user_client, "/?page=2") == 0, (
+        "Убедитесь, что количество постов в ленте берётся из кэша."
+    )
+
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now())
+    response = user_client.get("/")
+    assert response.context["paginator"].count == len(feed_posts) + 1, (
+        "Убедитесь, что закэшированное количество постов сбрасывается при"
+        " изменении публикаций."
+    )
+
+
+def test_comments_are_loaded_in_portions(
+        user_client, another_user_client, mixer: Mixer, user,
+        post_with_published_location):
+    from core.constants import COMMENTS_PER_PAGE
+
+    post = post_with_published_location
+    comments = mixer.cycle(COMMENTS_PER_PAGE + 5).blend(
+        "blog.Comment", post=post, author=user, is_published=True)
+
+    first = user_client.get(f"/posts/{post.id}/").context["comments"]
+    assert len(first) == COMMENTS_PER_PAGE, (
+        "Убедитесь, что на странице поста выводится ограниченное число"
+        " комментариев."
+    )
+    response = user_client.get(
+        f"/posts/{post.id}/comments/?after={first.next_cursor}")
+    rest = response.context["comments"]
+    assert [c.id for c in first] + [c.id for c in rest] == [
+        c.id for c in comments]
+    assert not rest.has_next()
+    assert "<html" not in response.content.decode()
+
+    post.is_published = False
+    post.save()
+    assert another_user_client.get(
+        f"/posts/{post.id}/comments/").status_code == 404
@@ -0,0 +1,31 @@
+import pytest
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+# Сессия, пользователь, пост со связанными объектами, комментарии с
+# авторами.
+DETAIL_QUERIES = 4
+
+
+@pytest.mark.parametrize("n_comments", [1, 15])
+def test_post_detail_query_count(
+        user_client, mixer: Mixer, another_user,
+        post_with_published_location, django_assert_num_queries,
+        n_comments):
+    post = post_with_published_location
+    mixer.cycle(n_comments).blend(
+        "blog.Comment", post=post, author=another_user, is_published=True)
+
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = user_client.get(f"/posts/{post.id}/")
+    assert response.status_code == 200
+
+
+def test_unpublished_post_hidden_from_others(
+        another_user_client, user_client, post_with_published_location):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    assert another_user_client.get(f"/posts/{post.id}/").status_code == 404
+    assert user_client.get(f"/posts/{post.id}/").status_code == 200
@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+BAD_PLAN_STEPS = ("USE TEMP B-TREE",)
+
+
+def _is_full_scan(detail: str) -> bool:
+    # «SCAN blog_post» без «USING INDEX» — полный обход таблицы.
+    return detail.startswith("SCAN ") and " USING " not in detail
+
+
+def _bad_plan_steps(sql: str) -> list:
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        details = [row[-1] for row in cursor.fetchall()]
+    return [
+        detail for detail in details
+        if _is_full_scan(detail)
+        or any(step in detail for step in BAD_PLAN_STEPS)
+    ]
+
+
+@pytest.fixture
+def blog_content(mixer: Mixer, user, published_category, published_location):
+    posts = mixer.cycle(15).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+        is_published=True,
+    )
+    mixer.cycle(5).blend(
+        "blog.Comment", post=posts[0], author=user, is_published=True)
+    return posts
+
+
+def test_hot_queries_use_indexes(
+        user_client, user, published_category, blog_content):
+    pages = (
+        ("/", {}),
+        ("/", {"page": 2}),
+        (f"/category/{published_category.slug}/", {}),
+        (f"/profile/{user.username}/", {}),
+        (f"/posts/{blog_content[0].id}/", {}),
+    )
+    for url, params in pages:
+        with CaptureQueriesContext(connection) as ctx:
+            response = user_client.get(url, params)
+        assert response.status_code == 200
+        # Журнал запросов сбрасывается при следующем запросе клиента.
+        captured = list(ctx.captured_queries)
+        first_page = response.context.get("page_obj")
+        if first_page is not None and first_page.has_next():
+            with CaptureQueriesContext(connection) as ctx:
+                response = user_client.get(
+                    url, {"after": first_page.next_cursor})
+            assert response.status_code == 200
+            assert response.context["page_obj"].number is None, (
+                "Убедитесь, что проверяется план запроса страницы курсора."
+            )
+            captured += ctx.captured_queries
+
+        for query in captured:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or '"blog_' not in sql:
+                continue
+            # captured_queries содержит SQL с подставленными параметрами.
+            bad_steps = _bad_plan_steps(sql)
+            assert not bad_steps, (
+                f"Запрос страницы {url} выполняется без подходящего индекса"
+                f" ({'; '.join(bad_steps)}):\n{sql}"
+            )
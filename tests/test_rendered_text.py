@@ -0,0 +1,37 @@
+import pytest
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+RAW_TEXT = "<b>жирный</b>\nвторая строка"
+RENDERED = "&lt;b&gt;жирный&lt;/b&gt;<br>вторая строка"
+
+
+def test_html_is_rendered_on_save(
+        user_client, mixer: Mixer, user, post_with_published_location):
+    post = post_with_published_location
+    post.text = RAW_TEXT
+    post.save()
+    comment = mixer.blend("blog.Comment", post=post, author=user,
+                          is_published=True, text=RAW_TEXT)
+    for item in (post, comment):
+        item.refresh_from_db()
+        assert item.text_html == RENDERED, (
+            "Убедитесь, что HTML текста готовится при сохранении."
+        )
+    content = user_client.get(f"/posts/{post.id}/").content.decode()
+    assert content.count(RENDERED) == 2
+
+
+def test_stale_html_is_rerendered(
+        user_client, post_with_published_location):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(
+        text=RAW_TEXT, text_html="старый", text_html_version=0)
+    assert RENDERED in user_client.get(f"/posts/{post.id}/").content.decode()
+
+    call_command("rerender_texts")
+    post.refresh_from_db()
+    assert post.text_html == RENDERED
+    assert post.text_html_version > 0
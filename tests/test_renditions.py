@@ -0,0 +1,100 @@
+from io import BytesIO
+
+import pytest
+from blog.renditions import rendition_name, rendition_names
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("media_root")]
+
+
+@pytest.fixture
+def post_with_image(post_with_published_location):
+    data = BytesIO()
+    Image.new("RGB", (1600, 1200), "red").save(data, "JPEG")
+    post = post_with_published_location
+    post.image = SimpleUploadedFile("photo.jpg", data.getvalue())
+    post.save()
+    yield post
+    storage = post.image.storage
+    for name in rendition_names(post.image.name):
+        storage.delete(name)
+    storage.delete(post.image.name)
+
+
+def test_card_falls_back_to_original(user_client, post_with_image):
+    content = user_client.get("/").content.decode()
+    assert f'src="{post_with_image.image.url}"' in content
+
+
+def test_renditions_replace_original(user_client, post_with_image):
+    post = post_with_image
+    user_client.get("/")
+    call_command("build_renditions")
+
+    storage = post.image.storage
+    with storage.open(rendition_name(post.image.name, "card")) as file:
+        assert Image.open(file).size == (400, 300)
+
+    card = storage.url(rendition_name(post.image.name, "card"))
+    assert f'src="{card}"' in user_client.get("/").content.decode(), (
+        "Убедитесь, что после построения копий карточка ссылается на"
+        " уменьшенную картинку, а кэш карточки сброшен."
+    )
+    detail = storage.url(rendition_name(post.image.name, "detail"))
+    assert f'src="{detail}"' in user_client.get(
+        f"/posts/{post.id}/").content.decode()
+
+
+def test_image_dimensions_and_srcset(user_client, post_with_image):
+    post = post_with_image
+    post.refresh_from_db()
+    assert (post.image_width, post.image_height) == (1600, 1200), (
+        "Убедитесь, что размеры картинки сохраняются при загрузке."
+    )
+    content = user_client.get("/").content.decode()
+    for attribute in ('width="1600"', 'height="1200"', 'loading="lazy"',
+                      'decoding="async"'):
+        assert attribute in content
+
+    call_command("build_renditions")
+    content = user_client.get("/").content.decode()
+    storage = post.image.storage
+    card = storage.url(rendition_name(post.image.name, "card"))
+    detail = storage.url(rendition_name(post.image.name, "detail"))
+    assert (f'srcset="{card} 400w, {detail} 960w, {post.image.url} 1600w"'
+            in content)
+
+
+def test_modern_formats_are_offered(user_client, post_with_image):
+    post = post_with_image
+    call_command("build_renditions")
+    storage = post.image.storage
+    webp = rendition_name(post.image.name, "card", "webp")
+    with storage.open(webp) as file:
+        assert Image.open(file).format == "WEBP"
+
+    content = user_client.get("/").content.decode()
+    assert "<picture>" in content
+    assert (f'<source type="image/webp" srcset="{storage.url(webp)} 400w'
+            in content), (
+        "Убедитесь, что карточка предлагает браузеру копии в WebP."
+    )
+    assert content.index('type="image/webp"') < content.index(
+        "<img class=\"border-3")
+
+
+def test_missing_image_file_does_not_break_pages(client, post_with_image):
+    post = post_with_image
+    post.image.storage.delete(post.image.name)
+    # Так выглядят посты, размеры которых не удалось прочитать.
+    type(post).objects.filter(pk=post.pk).update(
+        image_width=None, image_height=None)
+
+    post.refresh_from_db()
+    for url in ("/", f"/posts/{post.id}/"):
+        assert client.get(url).status_code == 200, (
+            "Убедитесь, что пропавший файл картинки не ломает страницы:"
+            " модель не должна открывать файл при загрузке из базы."
+        )
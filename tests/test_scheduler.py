@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import pytest
+from blog.scheduler import (
+    get_next_change_time,
+    publish_due_posts,
+    reset_next_change_time,
+)
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def scheduled_post(mixer: Mixer, user, published_category):
+    return mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(hours=1))
+
+
+def _feed_ids(client):
+    return [post.id for post in client.get("/").context["page_obj"]]
+
+
+def test_next_change_time_is_nearest_scheduled(scheduled_post):
+    assert not scheduled_post.is_live
+    assert get_next_change_time() == scheduled_post.pub_date
+
+
+def test_due_post_is_published_on_request(user_client, scheduled_post):
+    assert scheduled_post.id not in _feed_ids(user_client)
+
+    # Время публикации наступило без сохранения поста — так для
+    # планировщика выглядит обычное течение времени.
+    type(scheduled_post).objects.filter(pk=scheduled_post.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1))
+    reset_next_change_time()
+
+    assert scheduled_post.id in _feed_ids(user_client), (
+        "Убедитесь, что отложенный пост появляется в ленте, когда наступает"
+        " время его публикации."
+    )
+    scheduled_post.refresh_from_db()
+    assert scheduled_post.is_live
+    assert get_next_change_time() is None
+
+
+def test_publish_due_posts(scheduled_post):
+    assert publish_due_posts() == []
+    assert publish_due_posts(
+        now=timezone.now() + timedelta(hours=2)) == [scheduled_post.id]
@@ -0,0 +1,165 @@
+import pytest
+from core.cache import get_metrics
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _search(client, query, **params):
+    response = client.get("/search/", {"q": query, **params})
+    assert response.status_code == 200
+    return response
+
+
+def _ids(response):
+    return [post.id for post in response.context["page_obj"]]
+
+
+@pytest.fixture
+def searchable_posts(mixer: Mixer, user, published_category):
+    return mixer.cycle(3).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        title=(title for title in ("Кошки", "Про собак", "Разное")),
+        text=(text for text in (
+            "Рассказ о домашних кошках",
+            "Кошки упоминаются один раз среди длинного рассказа о собаках",
+            "Ничего интересного",
+        )),
+    )
+
+
+def test_search_ranks_title_matches_first(client, searchable_posts):
+    cats, dogs, _ = searchable_posts
+    response = _search(client, "кошк")
+    assert _ids(response) == [cats.id, dogs.id], (
+        "Убедитесь, что поиск находит посты по началу слова и ставит"
+        " совпадения в заголовке выше."
+    )
+    assert cats.title in response.content.decode()
+
+
+def test_search_respects_visibility(client, searchable_posts):
+    cats, dogs, _ = searchable_posts
+    dogs.is_published = False
+    dogs.save()
+    assert _ids(_search(client, "кошки")) == [cats.id]
+
+    cats.category.is_published = False
+    cats.category.save()
+    assert _ids(_search(client, "кошки")) == []
+
+
+def test_index_follows_related_changes(
+        client, searchable_posts, published_location):
+    _, _, other = searchable_posts
+    other.location = published_location
+    other.save()
+    published_location.name = "Антарктида"
+    published_location.save()
+    assert _ids(_search(client, "антарктида")) == [other.id]
+
+    published_location.delete()
+    assert _ids(_search(client, "антарктида")) == []
+
+    other.delete()
+    assert _ids(_search(client, "интересного")) == []
+
+
+def test_query_syntax_is_not_interpreted(client, searchable_posts):
+    for query in ('"', "title:кошки", "NEAR(", "*", ""):
+        _search(client, query)
+
+
+def test_search_cursor_walk(client, mixer: Mixer, user, published_category):
+    posts = mixer.cycle(25).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, title="Совпадение")
+    seen = []
+    response = _search(client, "совпадение")
+    while True:
+        seen.extend(_ids(response))
+        page = response.context["page_obj"]
+        if not page.has_next():
+            break
+        assert "q=" in response.content.decode().split(page.next_cursor)[0]
+        response = _search(client, "совпадение", after=page.next_cursor)
+    assert sorted(seen) == sorted(post.id for post in posts)
+    assert len(seen) == len(set(seen))
+
+    back = _search(client, "совпадение",
+                   before=response.context["page_obj"].previous_cursor)
+    assert len(_ids(back)) == 10
+    assert client.get(
+        "/search/", {"q": "совпадение", "after": "bad"}).status_code == 404
+
+
+def test_visible_ids_are_checked_in_chunks(searchable_posts, monkeypatch):
+    from blog import search
+    from blog.models import Post
+
+    visible = Post.objects.filter(is_published=True)
+    expected = search.search_ranked("кошки", visible)
+    monkeypatch.setattr(search, "SEARCH_ID_CHUNK_SIZE", 1)
+    with CaptureQueriesContext(connection) as queries:
+        assert search.search_ranked("кошки", visible) == expected
+    assert len(queries) == 1 + len(expected), (
+        "Убедитесь, что видимость найденных постов проверяется порциями"
+        " id: SQLite до 3.32 ограничивает запрос 999 параметрами."
+    )
+
+
+def test_rebuild_search_index(client, searchable_posts):
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM blog_post_search")
+    assert _ids(_search(client, "кошки")) == []
+    call_command("rebuild_search_index")
+    assert len(_ids(_search(client, "кошки"))) == 2
+
+
+def _fts_queries(client, query, **params):
+    with CaptureQueriesContext(connection) as ctx:
+        response = _search(client, query, **params)
+    return response, [
+        q["sql"] for q in ctx.captured_queries if "MATCH" in q["sql"]]
+
+
+def test_repeated_search_is_cached(client, searchable_posts):
+    cats, dogs, _ = searchable_posts
+    _, first = _fts_queries(client, "Кошки!")
+    assert len(first) == 2
+    response, repeated = _fts_queries(client, "  кошки ")
+    assert repeated == [], (
+        "Убедитесь, что повторный поиск по тому же нормализованному запросу"
+        " берётся из кэша вместе с фрагментами."
+    )
+    assert _ids(response) == [cats.id, dogs.id]
+    assert get_metrics("search_cache_hit")["search_cache_hit"] == 1
+
+    cats.title = "Попугаи"
+    cats.text = "Только попугаи"
+    cats.save()
+    response, _ = _fts_queries(client, "кошки")
+    assert _ids(response) == [dogs.id], (
+        "Убедитесь, что кэш поиска сбрасывается при обновлении индекса."
+    )
+
+
+def test_snippets_are_highlighted_for_shown_page(
+        client, mixer: Mixer, user, published_category):
+    mixer.cycle(15).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, title="Заметка",
+        text="<script>x</script> про кошек и не только")
+    response, queries = _fts_queries(client, "кошек")
+    snippet_sql = [sql for sql in queries if "snippet(" in sql]
+    assert len(snippet_sql) == 1
+    snippets = response.context["snippets"]
+    assert len(snippets) == 10
+    assert "<mark>кошек</mark>" in snippets[0]
+    assert "<script>" not in response.content.decode()
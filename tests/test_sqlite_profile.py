@@ -0,0 +1,52 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+def test_pragmas_are_applied_to_new_connections(settings):
+    connection.ensure_connection()
+    assert _pragma("busy_timeout") == settings.SQLITE_PRAGMAS["busy_timeout"]
+    assert _pragma("synchronous") == 1, (
+        "Убедитесь, что прагмы из SQLITE_PRAGMAS выставляются при каждом"
+        " подключении к базе."
+    )
+    assert _pragma("temp_store") == 2
+
+
+def test_connections_are_persistent(settings):
+    assert settings.DATABASES["default"]["CONN_MAX_AGE"] > 0
+
+
+def test_benchmark_reports_both_profiles():
+    out = StringIO()
+    call_command("benchmark_sqlite", duration=0.2, posts=50, readers=2,
+                 writers=1, stdout=out)
+    report = out.getvalue()
+    assert report.count("запросов/с") == 4
+    assert "SQLITE_PRAGMAS" in report
+
+
+def test_benchmark_baseline_has_no_busy_timeout(tmp_path, settings):
+    from blog.management.commands.benchmark_sqlite import Worker
+
+    def busy_timeout(pragmas):
+        worker = Worker(str(tmp_path / "db.sqlite3"), pragmas, True, False,
+                        1, 0)
+        return worker.connect().execute("PRAGMA busy_timeout").fetchone()[0]
+
+    assert busy_timeout({}) == 0, (
+        "Убедитесь, что профиль по умолчанию не ждёт блокировку: модуль"
+        " sqlite3 без timeout=0 выставляет ожидание в 5 с."
+    )
+    assert busy_timeout(settings.SQLITE_PRAGMAS) == (
+        settings.SQLITE_PRAGMAS["busy_timeout"])
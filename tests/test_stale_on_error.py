@@ -0,0 +1,79 @@
+import pytest
+from core.cache import get_metrics, invalidate_tags
+from core.db import query_time_budget
+from django.db import OperationalError, connection
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def locked_feed(monkeypatch):
+    from blog.views import PostListView
+
+    def locked(self):
+        raise OperationalError("database is locked")
+
+    monkeypatch.setattr(PostListView, "get_queryset", locked)
+
+
+def test_last_good_page_is_served_on_db_error(
+        client, post_with_published_location, request):
+    client.get("/")
+    invalidate_tags("post-list")
+    request.getfixturevalue("locked_feed")
+    response = client.get("/")
+    assert response.status_code == 200, (
+        "Убедитесь, что при ошибке базы анонимному посетителю отдаётся"
+        " последняя сохранённая копия страницы."
+    )
+    assert response["X-Page-Cache"] == "DEGRADED"
+    assert "Stale" in response["Warning"]
+    assert "no-cache" in response["Cache-Control"]
+    assert post_with_published_location.title in response.content.decode()
+    assert get_metrics("page_cache_degraded")["page_cache_degraded"] == 1
+
+
+def test_db_error_without_cached_page_is_raised(
+        client, locked_feed, post_with_published_location):
+    with pytest.raises(OperationalError):
+        client.get("/")
+
+
+def test_query_time_budget_interrupts_long_query():
+    with pytest.raises(OperationalError):
+        with query_time_budget(0.01), connection.cursor() as cursor:
+            cursor.execute(
+                "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL"
+                " SELECT x + 1 FROM n WHERE x < 100000000)"
+                " SELECT count(*) FROM n"
+            )
+    assert get_metrics("db_budget_exceeded")["db_budget_exceeded"] == 1
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone() == (1,)
+
+
+@pytest.mark.parametrize("view_name", ["ProfileListView", "PostSearchView"])
+def test_profile_and_search_fall_back_to_cached_page(
+        client, user, post_with_published_location, monkeypatch, view_name):
+    from blog import views
+
+    post = post_with_published_location
+    url, params = {
+        "ProfileListView": (f"/profile/{user.username}/", {}),
+        "PostSearchView": ("/search/", {"q": post.title}),
+    }[view_name]
+    client.get(url, params)
+    invalidate_tags("post-list")
+
+    def locked(self):
+        raise OperationalError("database is locked")
+
+    monkeypatch.setattr(getattr(views, view_name), "get_queryset", locked)
+    response = client.get(url, params)
+    assert response.status_code == 200, (
+        f"Убедитесь, что {view_name} при ошибке базы отдаёт анонимному"
+        " посетителю последнюю сохранённую копию страницы."
+    )
+    assert response["X-Page-Cache"] == "DEGRADED"
+    assert post.title in response.content.decode()
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+from core.cache_backends import SQLiteCache, TwoTierCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    def make(**options):
+        return TwoTierCache(str(tmp_path / "cache"), {
+            "OPTIONS": {
+                "LOCAL_MAX_ENTRIES": 2,
+                "LOCAL_EXCLUDE_PREFIXES": ("tag-version:",),
+                **options,
+            },
+        })
+    return make
+
+
+def test_local_tier_serves_hot_keys(make_cache):
+    cache = make_cache()
+    cache.set("page", {"html": "<p>"})
+    cache.shared.delete("page")
+    assert cache.get("page") == {"html": "<p>"}, (
+        "Убедитесь, что повторное чтение ключа берётся из памяти процесса."
+    )
+    assert make_cache().get("page") is None
+
+
+def test_local_copy_is_not_shared_object(make_cache):
+    cache = make_cache()
+    cache.set("items", [1])
+    cache.get("items").append(2)
+    assert cache.get("items") == [1]
+
+
+def test_excluded_keys_are_read_from_shared_tier(make_cache):
+    first, second = make_cache(), make_cache()
+    first.set("tag-version:post-list", "old")
+    assert second.get("tag-version:post-list") == "old"
+    second.set("tag-version:post-list", "new")
+    assert first.get("tag-version:post-list") == "new", (
+        "Убедитесь, что версии тегов не кэшируются в памяти процесса,"
+        " иначе сброс тегов в другом процессе не будет замечен."
+    )
+
+
+def test_delete_and_incr_drop_local_copy(make_cache):
+    first, second = make_cache(), make_cache()
+    first.set("counter", 1)
+    second.get("counter")
+    first.incr("counter")
+    second.delete("counter")
+    assert first.get("counter") is None
+
+
+def test_local_tier_is_bounded(make_cache):
+    cache = make_cache()
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.shared.clear()
+    assert cache.get_many(["a", "b", "c"]) == {"b": "b", "c": "c"}
+
+
+def test_local_copy_expires(make_cache):
+    cache = make_cache(LOCAL_TIMEOUT=0)
+    cache.set("page", "html")
+    cache.shared.delete("page")
+    assert cache.get("page") is None
+
+
+@pytest.fixture(params=["native", "fallback"])
+def shared_cache(request, tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache"), {
+        "OPTIONS": {"MAX_ENTRIES": 10, "CULL_EVERY": 5},
+    })
+    if request.param == "fallback":
+        # Как на SQLite без RETURNING (< 3.35) и upsert (< 3.24).
+        cache.HAS_RETURNING = cache.HAS_UPSERT = False
+    return cache
+
+
+def test_shared_incr_is_atomic(shared_cache):
+    shared_cache.set("metric:hits", 0, None)
+
+    def worker():
+        for _ in range(200):
+            shared_cache.incr("metric:hits")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert shared_cache.get("metric:hits") == 800, (
+        "Убедитесь, что счётчики общего кэша не теряют увеличения."
+    )
+    with pytest.raises(ValueError):
+        shared_cache.incr("metric:missing")
+
+
+def test_shared_add_respects_live_and_expired_keys(shared_cache):
+    assert shared_cache.add("lock", True, 60)
+    assert not shared_cache.add("lock", True, 60)
+    shared_cache.set("expired", "old", 60)
+    shared_cache.touch("expired", 0)
+    assert shared_cache.get("expired") is None
+    assert shared_cache.add("expired", "new", 60)
+    assert shared_cache.get("expired") == "new"
+
+
+def test_shared_tier_is_culled_on_schedule(shared_cache):
+    shared_cache.set_many({f"key-{i}": i for i in range(9)}, 60)
+    shared_cache.set("tag-version:post-list", "v", None)
+    assert shared_cache.get_many(
+        [f"key-{i}" for i in range(9)]) == {f"key-{i}": i for i in range(9)}
+    shared_cache.set_many({f"more-{i}": i for i in range(5)}, 60)
+    (count,) = shared_cache._connection.execute(
+        "SELECT COUNT(*) FROM cache").fetchone()
+    assert count <= 10
+    assert shared_cache.get("tag-version:post-list") == "v"
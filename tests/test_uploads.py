@@ -0,0 +1,122 @@
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+from blog.uploads import ProcessedImageField
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+
+@pytest.fixture(autouse=True, scope="module")
+def upload_pool():
+    from blog import uploads
+
+    yield
+    # Пул заменяет отработавший процесс новым; без остановки он запустил
+    # бы его уже после того, как pytest вернёт прежний sys.path.
+    uploads.get_pool().shutdown(wait=True)
+    uploads._pool = None
+
+
+def _upload(image, image_format="JPEG", **save_kwargs):
+    data = BytesIO()
+    image.save(data, image_format, **save_kwargs)
+    return SimpleUploadedFile(f"photo.{image_format.lower()}",
+                              data.getvalue())
+
+
+def _png_header(width, height):
+    # Только сигнатура и IHDR: по заголовку картинка огромная, но
+    # декодировать её не придётся.
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return SimpleUploadedFile("bomb.png", b"\x89PNG\r\n\x1a\n" + b"".join(
+        struct.pack(">I", len(data)) + tag + data
+        + struct.pack(">I", zlib.crc32(tag + data))
+        for tag, data in ((b"IHDR", ihdr), (b"IEND", b""))
+    ))
+
+
+def test_upload_is_reencoded_without_exif():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera"
+    exif[0x0112] = 6  # Повёрнуто на 90°
+    upload = _upload(Image.new("RGB", (4000, 3000)), exif=exif.tobytes())
+
+    processed = ProcessedImageField().clean(upload)
+    image = Image.open(processed)
+    assert image.size == (1920, 2560), (
+        "Убедитесь, что загрузка уменьшается и поворачивается по EXIF."
+    )
+    assert not image.getexif()
+    assert processed.name == "photo.jpg"
+
+
+@pytest.fixture(params=["process-per-task", "reused-process"])
+def pool_mode(request, monkeypatch):
+    from blog import uploads
+
+    if request.param == "reused-process":
+        # Как на Python < 3.11: процесс пула выполняет все задания.
+        monkeypatch.setattr(uploads, "_POOL_OPTIONS", {})
+        monkeypatch.setattr(uploads, "UPLOAD_WORKERS", 1)
+        monkeypatch.setattr(uploads, "_pool", None)
+        yield
+        uploads.get_pool().shutdown(wait=True)
+    else:
+        yield
+
+
+def test_peak_rss_is_measured_per_upload(pool_mode):
+    large = ProcessedImageField().clean(
+        _upload(Image.new("RGB", (4000, 4000)), "PNG"))
+    small = ProcessedImageField().clean(
+        _upload(Image.new("RGB", (64, 64)), "PNG"))
+    # Растр 4000×4000 RGB — 48 МБ, и он декодируется не один раз.
+    assert large.processing["peak_rss_kib"] > 48 * 1024
+    assert small.processing["peak_rss_kib"] < (
+        large.processing["peak_rss_kib"] - 48 * 1024), (
+        "Убедитесь, что пиковый RSS считается для каждой загрузки"
+        " отдельно, а не за всю жизнь процесса пула."
+    )
+
+
+def test_memory_limit_is_enforced_in_worker(monkeypatch):
+    from blog import uploads
+
+    monkeypatch.setattr(uploads, "UPLOAD_MEMORY_LIMIT", 128 * 1024 * 1024)
+    monkeypatch.setattr(uploads, "_pool", None)
+    try:
+        with pytest.raises(ValidationError) as error:
+            ProcessedImageField().clean(
+                _upload(Image.new("RGB", (4000, 4000)), "PNG"))
+        assert error.value.code == "too_large", (
+            "Убедитесь, что процесс перекодирования ограничен по памяти."
+        )
+        assert ProcessedImageField().clean(
+            _upload(Image.new("RGB", (64, 64)), "PNG"))
+    finally:
+        uploads.reset_pool()
+
+
+def test_transparent_upload_stays_png():
+    processed = ProcessedImageField().clean(
+        _upload(Image.new("RGBA", (10, 10)), "PNG"))
+    assert Image.open(processed).format == "PNG"
+
+
+@pytest.mark.parametrize("size", [(7000, 7000), (50000, 50000)])
+def test_decompression_bomb_is_refused(size):
+    with pytest.raises(ValidationError) as error:
+        ProcessedImageField().clean(_png_header(*size))
+    assert error.value.code == "too_large"
+
+
+def test_unsupported_format_is_refused():
+    with pytest.raises(ValidationError) as error:
+        ProcessedImageField().clean(_upload(Image.new("RGB", (5, 5)), "BMP"))
+    assert error.value.code == "invalid_format"
+    with pytest.raises(ValidationError):
+        ProcessedImageField().clean(
+            SimpleUploadedFile("text.jpg", b"not an image"))
@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+from core import writes
+from core.cache import (
+    HIT,
+    STALE,
+    get_metrics,
+    get_tag_versions,
+    get_tagged,
+    set_tagged,
+)
+from blog.scheduler import NEXT_CHANGE_KEY, NO_PENDING
+from core.pagination import COUNT_GENERATION_KEY
+from core.writes import WriteQueue, WriteQueueFull
+from django.core.cache import cache
+from django.db import transaction
+
+pytestmark = [pytest.mark.usefixtures("media_root")]
+
+
+def _create_category(slug):
+    from blog.models import Category
+
+    return Category.objects.create(
+        title=slug, description=slug, slug=slug, is_published=True)
+
+
+def _blocking_job(started, release):
+    def job():
+        started.set()
+        release.wait(5)
+        return "first"
+    return job
+
+
+def _submit_in_thread(write_queue, func, *args, results=None):
+    def run():
+        try:
+            value = write_queue.submit(func, *args)
+        except Exception as error:
+            value = error
+        if results is not None:
+            results.append(value)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_for_queued(write_queue, size):
+    deadline = time.monotonic() + 5
+    while write_queue._jobs.qsize() < size and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_queued_writes_are_committed_in_batches():
+    from blog.models import Category
+
+    write_queue = WriteQueue(max_size=10, batch_size=10)
+    started, release = threading.Event(), threading.Event()
+    results = []
+    threads = [_submit_in_thread(
+        write_queue, _blocking_job(started, release), results=results)]
+    started.wait(5)
+    threads += [
+        _submit_in_thread(write_queue, _create_category, f"slug-{i}",
+                          results=results)
+        for i in range(5)
+    ]
+    threads.append(_submit_in_thread(
+        write_queue, _create_category, "slug-0", results=results))
+    _wait_for_queued(write_queue, 6)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert Category.objects.count() == 5
+    assert sum(isinstance(value, Exception) for value in results) == 1, (
+        "Убедитесь, что ошибка одного задания не отменяет остальные"
+        " задания пакета."
+    )
+    assert get_metrics("write_batches")["write_batches"] == 2, (
+        "Убедитесь, что накопившиеся в очереди записи фиксируются одной"
+        " транзакцией."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_full_queue_rejects_writes(monkeypatch):
+    monkeypatch.setattr(writes, "WRITE_QUEUE_PUT_TIMEOUT", 0.05)
+    write_queue = WriteQueue(max_size=1)
+    started, release = threading.Event(), threading.Event()
+    threads = [_submit_in_thread(write_queue, _blocking_job(started, release))]
+    started.wait(5)
+    threads.append(_submit_in_thread(write_queue, lambda: None))
+    _wait_for_queued(write_queue, 1)
+    try:
+        with pytest.raises(WriteQueueFull):
+            write_queue.submit(lambda: None)
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join(5)
+    assert get_metrics("write_queue_full")["write_queue_full"] == 1
+
+
+@pytest.mark.django_db
+def test_write_inside_transaction_runs_inline():
+    assert WriteQueue().submit(threading.current_thread) is (
+        threading.current_thread())
+
+
+@pytest.mark.django_db
+def test_comment_view_answers_503_when_queue_is_full(
+        user_client, post_with_published_location, monkeypatch):
+    def full(func, *args, **kwargs):
+        raise WriteQueueFull
+
+    monkeypatch.setattr("core.mixins.submit_write", full)
+    response = user_client.post(
+        f"/posts/{post_with_published_location.id}/comment/",
+        {"text": "Комментарий"},
+    )
+    assert response.status_code == 503
+    assert response.has_header("Retry-After")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_entries_stored_before_commit_become_stale(
+        post_with_published_location):
+    post = post_with_published_location
+    tags = ("post-list", f"post:{post.pk}")
+    with transaction.atomic():
+        post.title = "Заголовок после правки"
+        post.save()
+        # Так поступает конкурентный читатель: данные он видит старые,
+        # а версии тегов — уже сброшенные сигналом.
+        set_tagged("page", "старая страница", tags,
+                   known_versions=get_tag_versions(tags))
+        generation = cache.get(COUNT_GENERATION_KEY)
+        cache.set(NEXT_CHANGE_KEY, NO_PENDING)
+        assert get_tagged("page")[1] == HIT
+    assert get_tagged("page") == (None, STALE), (
+        "Убедитесь, что теги сбрасываются и после фиксации транзакции."
+    )
+    assert cache.get(COUNT_GENERATION_KEY) != generation
+    assert cache.get(NEXT_CHANGE_KEY) is None, (
+        "Убедитесь, что время ближайшей публикации сбрасывается и после"
+        " фиксации транзакции."
+    )
+
+
+@pytest.mark.django_db
+def test_post_image_is_stored_before_queueing(
+        user_client, published_category, monkeypatch):
+    from io import BytesIO
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.utils import timezone
+    from PIL import Image
+
+    stored_before = []
+
+    def submit(func, *args, **kwargs):
+        image = func.__self__.instance.image
+        stored_before.append(
+            image._committed and image.storage.exists(image.name))
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr("core.mixins.submit_write", submit)
+    data = BytesIO()
+    Image.new("RGB", (64, 48)).save(data, "JPEG")
+    response = user_client.post("/posts/create/", {
+        "title": "Пост с картинкой",
+        "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%d %H:%M"),
+        "category": published_category.pk,
+        "is_published": True,
+        "image": SimpleUploadedFile("photo.jpg", data.getvalue()),
+    })
+    assert response.status_code == 302
+    assert stored_before == [True], (
+        "Убедитесь, что файл картинки записывается в хранилище до"
+        " постановки сохранения в очередь записи."
+    )
+    from blog.models import Post
+
+    post = Post.objects.get(title="Пост с картинкой")
+    assert (post.image_width, post.image_height) == (64, 48)